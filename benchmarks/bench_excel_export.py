@@ -0,0 +1,69 @@
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import write_xlsx
+
+def make_links(rows):
+    """Synthetic library shaped like links.xlsx"""
+    return pd.DataFrame({
+        "link_id": [f"{i:08x}-0000-4000-8000-000000000000" for i in range(rows)],
+        "url": [f"https://example{i % 5000}.com/articles/{i}" for i in range(rows)],
+        "title": [f"Example article number {i}" for i in range(rows)],
+        "description": ["A short description of the page, as fetched from its metadata."] * rows,
+        "tags": ["News, Research"] * rows,
+        "created_at": ["2024-01-01 12:00:00"] * rows,
+        "updated_at": ["2024-01-01 12:00:00"] * rows,
+        "priority": ["Medium"] * rows,
+        "number": list(range(rows)),
+        "is_duplicate": [False] * rows
+    })
+
+def legacy_export(df, fh):
+    """The previous approach: full openpyxl workbook, then one hyperlink assignment per row"""
+    with pd.ExcelWriter(fh, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Links")
+        worksheet = writer.sheets["Links"]
+        for idx, url in enumerate(df["url"], start=2):
+            worksheet[f"B{idx}"].hyperlink = url
+            worksheet[f"B{idx}"].style = "Hyperlink"
+
+def measure(export, df):
+    """Return (seconds, peak traced MB, output MB) for one export"""
+    # Time an untraced run: tracemalloc slows allocation-heavy code several times over
+    buffer = BytesIO()
+    start = time.perf_counter()
+    export(df, buffer)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    export(df, BytesIO())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, len(buffer.getvalue()) / 2 ** 20
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XLSX export of the links library")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--legacy-max-rows", type=int, default=100000,
+                        help="skip the old exporter above this size (it needs minutes and GBs)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'engine':<10}{'rows':>10}{'seconds':>10}{'rows/sec':>12}{'peak MB':>10}{'file MB':>10}")
+    for rows in args.rows:
+        df = make_links(rows)
+        engines = [("streaming", write_xlsx)]
+        if rows <= args.legacy_max_rows:
+            engines.append(("legacy", legacy_export))
+        for name, export in engines:
+            elapsed, peak, size = measure(export, df)
+            print(f"{name:<10}{rows:>10}{elapsed:>10.2f}{rows / elapsed:>12.0f}{peak:>10.1f}{size:>10.1f}")
+
+if __name__ == "__main__":
+    main()
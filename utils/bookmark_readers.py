@@ -0,0 +1,250 @@
+import codecs
+import io
+import logging
+import math
+import os
+from datetime import datetime
+from html.parser import HTMLParser
+import pandas as pd
+from openpyxl import load_workbook
+
+IMPORT_CSV_CHUNK_ROWS = 5000
+IMPORT_PROGRESS_EVERY = 1000  # rows between progress reports for XLSX
+
+# Accepted spellings of each bookmark column, in order of preference
+BOOKMARK_COLUMNS = {
+    "url": ["URL", "url"],
+    "title": ["Title", "title"],
+    "description": ["Description", "description"],
+    "tags": ["Tags", "tags"],
+    "number": ["Number", "number"],
+}
+
+def resolve_columns(header):
+    """Map each bookmark field to its column index in header (exact spelling first, then any case)"""
+    names = [str(name).strip() if name is not None else "" for name in header]
+    columns = {}
+    for field, spellings in BOOKMARK_COLUMNS.items():
+        for spelling in spellings:
+            if spelling in names:
+                columns[field] = names.index(spelling)
+                break
+        else:
+            lowered = [name.lower() for name in names]
+            if field in lowered:
+                columns[field] = lowered.index(field)
+    return columns
+
+def _clean(value):
+    """Cell value as text, with empty cells and NaN as empty strings"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value).strip()
+
+def _number(value, default):
+    """Numeric cell value, falling back to the row position"""
+    if value is None or value == "" or (isinstance(value, float) and math.isnan(value)):
+        return default
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value or default
+
+def _file_size(fh):
+    """Size in bytes of an upload or an open file, or None if unknown"""
+    size = getattr(fh, "size", None)
+    if size is None and hasattr(fh, "fileno"):
+        try:
+            size = os.fstat(fh.fileno()).st_size
+        except (OSError, ValueError, io.UnsupportedOperation):
+            size = None
+    return size
+
+def _link_from_row(row, columns, position):
+    """Build a bookmark dict from one row of cells, or None when it has no URL"""
+    def cell(field):
+        index = columns.get(field)
+        return row[index] if index is not None and index < len(row) else None
+    url = _clean(cell("url"))
+    if not url:
+        return None
+    return {
+        "url": url,
+        "title": _clean(cell("title")),
+        "description": _clean(cell("description")),
+        "tags": _clean(cell("tags")),
+        "priority": "Low",
+        "number": _number(cell("number"), position)
+    }
+
+def iter_xlsx_bookmarks(fh, progress_callback=None):
+    """Yield bookmarks from the first sheet of an XLSX file, reading rows in read-only mode"""
+    workbook = load_workbook(fh, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        total = max((worksheet.max_row or 0) - 1, 0)
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = resolve_columns(header)
+        logging.debug(f"XLSX bookmark columns: {columns}, about {total} rows")
+        for position, row in enumerate(rows, start=1):
+            link = _link_from_row(row, columns, position)
+            if link:
+                yield link
+            if progress_callback and total and position % IMPORT_PROGRESS_EVERY == 0:
+                progress_callback(min(position / total, 1.0))
+    finally:
+        workbook.close()
+
+def iter_csv_bookmarks(fh, progress_callback=None):
+    """Yield bookmarks from a CSV file, parsing it in chunks of IMPORT_CSV_CHUNK_ROWS rows"""
+    size = _file_size(fh)
+    columns = None
+    position = 0
+    for chunk in pd.read_csv(fh, chunksize=IMPORT_CSV_CHUNK_ROWS):
+        if columns is None:
+            columns = resolve_columns(chunk.columns)
+            logging.debug(f"CSV bookmark columns: {columns}")
+        for row in chunk.itertuples(index=False, name=None):
+            position += 1
+            link = _link_from_row(row, columns, position)
+            if link:
+                yield link
+        if progress_callback and size:
+            progress_callback(min(fh.tell() / size, 1.0))
+
+# Browser root folders that say nothing about a link's topic
+ROOT_BOOKMARK_FOLDERS = {
+    "bookmarks", "bookmarks bar", "bookmarks toolbar", "bookmarks menu", "other bookmarks",
+    "mobile bookmarks", "favorites", "favorites bar", "favourites bar", "imported"
+}
+IMPORT_HTML_CHUNK_SIZE = 64 * 1024
+
+def _epoch_to_timestamp(value):
+    """ADD_DATE (seconds, or milli/microseconds in some exports) as a library timestamp, or '' if invalid"""
+    try:
+        seconds = float(value)
+        while seconds > 1e11:
+            seconds /= 1000
+        return datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return ""
+
+class NetscapeBookmarkParser(HTMLParser):
+    """Event-driven parser for browser bookmark exports: <H3> folders, nested <DL> lists, <A> links, <DD> notes"""
+
+    def __init__(self):
+        super().__init__()
+        self.folders = []  # open <DL> levels: folder name, or None for unnamed lists
+        self.pending_folder = None
+        self.text = None  # collects <H3>/<A>/<DD> text
+        self.text_tag = None
+        self.link = None  # last <A>, held back until its <DD> description has been read
+        self.links = []
+        self.position = 0
+
+    def _emit(self):
+        if self.link:
+            self.link["description"] = self.link["description"].strip()
+            self.links.append(self.link)
+            self.link = None
+        if self.text_tag == "dd":
+            self.text = self.text_tag = None
+
+    def _folder_tags(self):
+        tags = []
+        for folder in self.folders:
+            if folder and folder.lower() not in ROOT_BOOKMARK_FOLDERS and folder not in tags:
+                tags.append(folder)
+        return tags
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ["dt", "h3", "a"] or (tag == "dl" and self.link):
+            self._emit()
+        if tag == "h3":
+            self.text, self.text_tag = [], "h3"
+        elif tag == "dl":
+            self.folders.append(self.pending_folder)
+            self.pending_folder = None
+        elif tag == "a":
+            url = (attrs.get("href") or "").strip()
+            if url:
+                self.position += 1
+                tags = self._folder_tags()
+                # Firefox exports its own tags as TAGS="a,b"
+                for tag_name in (attrs.get("tags") or "").split(","):
+                    if tag_name.strip() and tag_name.strip() not in tags:
+                        tags.append(tag_name.strip())
+                self.link = {
+                    "url": url,
+                    "title": "",
+                    "description": "",
+                    "tags": ", ".join(tags),
+                    "priority": "Low",
+                    "number": self.position,
+                    "created_at": _epoch_to_timestamp(attrs.get("add_date"))
+                }
+                self.text, self.text_tag = [], "a"
+        elif tag == "dd" and self.link:
+            self.text, self.text_tag = [], "dd"
+
+    def handle_endtag(self, tag):
+        if tag == self.text_tag == "h3":
+            # Commas would split the folder into several tags
+            self.pending_folder = " ".join("".join(self.text).replace(",", " ").split())
+            self.text = self.text_tag = None
+        elif tag == self.text_tag == "a":
+            if self.link:
+                self.link["title"] = " ".join("".join(self.text).split())
+            self.text = self.text_tag = None
+        elif tag == "dl":
+            self._emit()
+            if self.folders:
+                self.folders.pop()
+
+    def handle_data(self, data):
+        if self.text_tag == "dd" and self.link:
+            self.link["description"] += data
+        elif self.text is not None:
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        self._emit()
+
+def iter_html_bookmarks(fh, progress_callback=None):
+    """Yield bookmarks from a Netscape-format HTML export, one chunk of the file at a time"""
+    size = _file_size(fh)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = NetscapeBookmarkParser()
+    read = 0
+    while True:
+        data = fh.read(IMPORT_HTML_CHUNK_SIZE)
+        if not data:
+            break
+        read += len(data)
+        parser.feed(decoder.decode(data) if isinstance(data, bytes) else data)
+        yield from parser.links
+        parser.links = []
+        if progress_callback and size:
+            progress_callback(min(read / size, 1.0))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield from parser.links
+    logging.debug(f"Parsed {parser.position} links from HTML bookmarks")
+
+BOOKMARK_READERS = {
+    "xlsx": iter_xlsx_bookmarks,
+    "csv": iter_csv_bookmarks,
+    "html": iter_html_bookmarks,
+    "htm": iter_html_bookmarks,
+}
+
+def iter_bookmarks(uploaded_file, progress_callback=None):
+    """Yield bookmark dicts from an uploaded Excel, CSV or HTML file, picking the reader by extension"""
+    file_type = uploaded_file.name.split(".")[-1].lower()
+    if file_type not in BOOKMARK_READERS:
+        raise ValueError("Unsupported file format. Use Excel, CSV, or HTML.")
+    return BOOKMARK_READERS[file_type](uploaded_file, progress_callback)
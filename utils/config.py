@@ -0,0 +1,30 @@
+import streamlit as st
+import logging
+import os
+
+def get_setting(name, default=None):
+    """Read a setting from the environment first, then from Streamlit secrets"""
+    value = os.environ.get(name)
+    if value is not None:
+        return value
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        # No secrets.toml (e.g. local runs or worker threads started before Streamlit)
+        return default
+
+def get_int_setting(name, default):
+    """Read an integer setting, falling back to default on bad values"""
+    value = get_setting(name, default)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        logging.warning(f"Setting {name}={value!r} is not an integer, using {default}")
+        return default
+
+def get_cache_dir(*parts):
+    """Return a directory under the local cache root (CACHE_DIR), creating it if needed"""
+    root = get_setting("CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "web_content_manager")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
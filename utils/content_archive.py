@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from utils.config import get_cache_dir, get_int_setting
+from utils.search_index import parse_query
+from utils.url_utils import canonical_url
+
+# Archive of the main text of fetched pages, shared by every session of this process.
+# Texts are zlib-compressed and stored once per distinct content (sha256), and a contentless
+# FTS5 table over the distinct texts answers BM25-ranked full-text queries from disk
+ARCHIVE_PAGE_TEXT = get_int_setting("ARCHIVE_PAGE_TEXT", 0)  # 1 to keep page text while fetching metadata
+ARCHIVE_MAX_CHARS = get_int_setting("ARCHIVE_MAX_CHARS", 200000)  # longer texts are truncated
+PAGE_TEXT_RESULTS = 5000  # best matching pages returned per query
+COMPRESSION_LEVEL = 6
+
+_LOCK = threading.Lock()
+_CONN = None
+FTS5_AVAILABLE = None  # decided when the archive is first opened
+
+def _connect():
+    """Open (once) the SQLite archive under the cache directory"""
+    global _CONN, FTS5_AVAILABLE
+    if _CONN is None:
+        path = os.path.join(get_cache_dir(), "content_archive.sqlite3")
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                id INTEGER PRIMARY KEY,
+                sha256 TEXT UNIQUE,
+                text BLOB,
+                size INTEGER
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT PRIMARY KEY,
+                blob_id INTEGER,
+                archived_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS pages_blob_id ON pages(blob_id)")
+        try:
+            # Contentless: the text already lives compressed in blobs, the index keeps only postings
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(body, content='', tokenize='unicode61 remove_diacritics 2')")
+            FTS5_AVAILABLE = True
+        except sqlite3.OperationalError as e:
+            FTS5_AVAILABLE = False
+            logging.warning(f"SQLite FTS5 not available, page text will be archived but not searchable: {str(e)}")
+        conn.commit()
+        logging.debug(f"Opened content archive at {path}")
+        _CONN = conn
+    return _CONN
+
+def is_archived(url):
+    """True if the page text of url is already in the archive"""
+    try:
+        with _LOCK:
+            return _connect().execute("SELECT 1 FROM pages WHERE url_key = ?", (canonical_url(url),)).fetchone() is not None
+    except sqlite3.Error as e:
+        logging.error(f"Content archive read failed for {url}: {str(e)}")
+        return False
+
+def _drop_orphan_blob(conn, blob_id):
+    """Delete a text, and its full-text index entry, once no page refers to it; call with _LOCK held"""
+    if conn.execute("SELECT 1 FROM pages WHERE blob_id = ?", (blob_id,)).fetchone():
+        return
+    row = conn.execute("SELECT text FROM blobs WHERE id = ?", (blob_id,)).fetchone()
+    if row is None:
+        return
+    if FTS5_AVAILABLE:
+        # A contentless table cannot look the text up itself: the 'delete' command needs the indexed text
+        conn.execute("INSERT INTO page_text (page_text, rowid, body) VALUES ('delete', ?, ?)",
+                     (blob_id, zlib.decompress(row[0]).decode("utf-8")))
+    conn.execute("DELETE FROM blobs WHERE id = ?", (blob_id,))
+
+def archive_page_text(url, text):
+    """Store the main text of a page; identical texts share one compressed copy and one index entry"""
+    text = " ".join(str(text or "").split())[:ARCHIVE_MAX_CHARS]
+    if not text:
+        return
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    try:
+        with _LOCK:
+            conn = _connect()
+            row = conn.execute("SELECT id FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+            if row is None:
+                blob_id = conn.execute(
+                    "INSERT INTO blobs (sha256, text, size) VALUES (?, ?, ?)",
+                    (digest, zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL), len(text))
+                ).lastrowid
+                if FTS5_AVAILABLE:
+                    conn.execute("INSERT INTO page_text (rowid, body) VALUES (?, ?)", (blob_id, text))
+            else:
+                blob_id = row[0]
+            url_key = canonical_url(url)
+            previous = conn.execute("SELECT blob_id FROM pages WHERE url_key = ?", (url_key,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (url_key, blob_id, time.time()))
+            if previous and previous[0] != blob_id:
+                _drop_orphan_blob(conn, previous[0])
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Content archive write failed for {url}: {str(e)}")
+
+def get_page_text(url):
+    """Archived main text of url, or None"""
+    try:
+        with _LOCK:
+            row = _connect().execute(
+                "SELECT blobs.text FROM pages JOIN blobs ON blobs.id = pages.blob_id WHERE pages.url_key = ?",
+                (canonical_url(url),)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+    except (sqlite3.Error, zlib.error) as e:
+        logging.error(f"Content archive read failed for {url}: {str(e)}")
+        return None
+
+def fts_query(query):
+    """Translate Browse search syntax into an FTS5 MATCH expression, quoting every term"""
+    groups = []
+    for group in parse_query(query):
+        terms = [f'"{token}"*' if prefix else f'"{token}"' for token, prefix in group]
+        groups.append(f"({' AND '.join(terms)})")
+    return " OR ".join(groups)
+
+def search_page_text(query, limit=PAGE_TEXT_RESULTS):
+    """Canonical URLs whose archived text matches the query, best BM25 score first"""
+    match = fts_query(query)
+    if not match:
+        return []
+    try:
+        with _LOCK:
+            conn = _connect()
+            if not FTS5_AVAILABLE:
+                return []
+            rows = conn.execute(
+                """
+                SELECT pages.url_key FROM (
+                    SELECT rowid, rank FROM page_text WHERE page_text MATCH ? ORDER BY rank LIMIT ?
+                ) AS hits JOIN pages ON pages.blob_id = hits.rowid
+                ORDER BY hits.rank
+                """,
+                (match, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+    except sqlite3.Error as e:
+        logging.error(f"Page text search failed for {query!r}: {str(e)}")
+        return []
+
+def get_archive_stats():
+    """Archived pages, distinct texts, and their raw and compressed sizes in bytes"""
+    try:
+        with _LOCK:
+            conn = _connect()
+            pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, raw, compressed = conn.execute("SELECT COUNT(*), TOTAL(size), TOTAL(LENGTH(text)) FROM blobs").fetchone()
+        return {"pages": pages, "texts": blobs, "raw_bytes": int(raw), "compressed_bytes": int(compressed)}
+    except sqlite3.Error as e:
+        logging.error(f"Content archive stats failed: {str(e)}")
+        return {"pages": 0, "texts": 0, "raw_bytes": 0, "compressed_bytes": 0}
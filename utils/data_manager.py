@@ -1,21 +1,56 @@
 import streamlit as st
 import pandas as pd
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 from oauth2client.service_account import ServiceAccountCredentials
 import io
+import httplib2
 import logging
 import os
 import json
+import queue
+import threading
+from contextlib import contextmanager
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment
 import uuid
+from datetime import datetime
+from utils.config import get_int_setting
+from utils.exporters import XLSX_MIMETYPE, write_xlsx, write_parquet
+from utils.url_index import follow_ops
 
-def get_drive_service():
-    """Initialize Google Drive API service"""
-    try:
+# Check for pyarrow availability (Parquet snapshots)
+try:
+    import pyarrow
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    logging.warning("pyarrow not available, loading libraries from Excel only")
+
+# Process-wide Drive client pool: credentials are parsed once and shared, and service objects
+# (each with its own keep-alive httplib2 connection) are checked out by one thread at a time and
+# returned for the next caller, so connections outlive the script-runner threads of Streamlit reruns
+DRIVE_POOL_SIZE = get_int_setting("DRIVE_POOL_SIZE", 8)  # idle services kept open
+_DRIVE_LOCK = threading.RLock()
+_DRIVE_CREDENTIALS = None
+_DRIVE_POOL = queue.Queue(maxsize=DRIVE_POOL_SIZE)
+_FILE_ID_CACHE = {}  # (folder_id, name) -> Drive file id
+DRIVE_HTTP_TIMEOUT = 60
+FILE_FIELDS = "id, name, modifiedTime, md5Checksum, trashed"
+# Uploads larger than one chunk go through a resumable session, chunk by chunk;
+# Drive requires chunk sizes in multiples of 256 KB
+UPLOAD_CHUNK_SIZE = max(1, get_int_setting("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024) // (256 * 1024)) * 256 * 1024
+UPLOAD_RETRIES = 5  # per-chunk retries on transient errors before the upload fails
+
+def _get_drive_credentials():
+    """Parse GOOGLE_DRIVE_CREDENTIALS once and return the shared service account credentials"""
+    global _DRIVE_CREDENTIALS
+    with _DRIVE_LOCK:
+        if _DRIVE_CREDENTIALS is not None:
+            return _DRIVE_CREDENTIALS
+        
         credentials_data = st.secrets.get("GOOGLE_DRIVE_CREDENTIALS")
-        logging.debug(f"Secrets keys available: {list(st.secrets.keys())}")
         if not credentials_data:
             logging.error("GOOGLE_DRIVE_CREDENTIALS not found in secrets")
             st.error("❌ GOOGLE_DRIVE_CREDENTIALS not found. Check Streamlit Cloud secrets.")
@@ -44,22 +79,464 @@ def get_drive_service():
             st.error(f"❌ Missing keys in GOOGLE_DRIVE_CREDENTIALS: {missing_keys}")
             return None
         
-        credentials = ServiceAccountCredentials.from_json_keyfile_dict(
-            credentials_data,
+        _DRIVE_CREDENTIALS = ServiceAccountCredentials.from_json_keyfile_dict(
+            dict(credentials_data),
             scopes=["https://www.googleapis.com/auth/drive"]
         )
-        logging.debug("Google Drive service initialized successfully")
-        return build("drive", "v3", credentials=credentials)
+        logging.debug("Google Drive credentials initialized")
+        return _DRIVE_CREDENTIALS
+
+def _refresh_token(credentials):
+    """Refresh the shared access token under the pool lock so threads don't race on it"""
+    with _DRIVE_LOCK:
+        if credentials.access_token is None or credentials.access_token_expired:
+            credentials.get_access_token()
+            logging.debug("Refreshed Google Drive access token")
+
+def _checkout_drive_service():
+    """Take an idle Drive service from the pool, or build one if none is idle; None if Drive is unavailable"""
+    try:
+        credentials = _get_drive_credentials()
+        if credentials is None:
+            return None
+        _refresh_token(credentials)
+        try:
+            return _DRIVE_POOL.get_nowait()
+        except queue.Empty:
+            http = credentials.authorize(httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT))
+            service = build("drive", "v3", http=http, cache_discovery=False)
+            logging.debug("Google Drive service initialized")
+            return service
     except Exception as e:
         logging.error(f"Failed to initialize Drive service: {str(e)}")
         st.error(f"❌ Failed to initialize Google Drive: {str(e)}")
         return None
 
+@contextmanager
+def drive_client():
+    """Check a Google Drive API service out of the pool for a with block (None if Drive is unavailable)"""
+    service = _checkout_drive_service()
+    try:
+        yield service
+    finally:
+        if service is not None:
+            try:
+                _DRIVE_POOL.put_nowait(service)
+            except queue.Full:
+                pass  # enough idle services already; this one's connection is dropped
+
+def drive_available():
+    """True if Google Drive credentials are configured and a service can be built"""
+    with drive_client() as service:
+        return service is not None
+
+def _forget_file_id(name, folder_id):
+    """Drop a cached file id, e.g. after the file was deleted or trashed"""
+    with _DRIVE_LOCK:
+        _FILE_ID_CACHE.pop((folder_id, name), None)
+
+def _lookup_file_id(drive_service, name, folder_id):
+    """Return the Drive file id for name in folder_id, listing the folder only on a cache miss"""
+    with _DRIVE_LOCK:
+        file_id = _FILE_ID_CACHE.get((folder_id, name))
+    if file_id:
+        return file_id
+    query = f"name='{name}' and '{folder_id}' in parents and trashed=false"
+    response = drive_service.files().list(q=query, fields="files(id, name)").execute()
+    files = response.get("files", [])
+    if not files:
+        return None
+    with _DRIVE_LOCK:
+        _FILE_ID_CACHE[(folder_id, name)] = files[0]["id"]
+    return files[0]["id"]
+
+def _get_files_meta(drive_service, names, folder_id):
+    """Return {name: Drive metadata} for the files in folder_id, with a single files().list call"""
+    name_query = " or ".join(f"name='{name}'" for name in names)
+    query = f"({name_query}) and '{folder_id}' in parents and trashed=false"
+    response = drive_service.files().list(q=query, fields=f"files({FILE_FIELDS})").execute()
+    metas = {}
+    for file_meta in response.get("files", []):
+        metas.setdefault(file_meta["name"], file_meta)
+    with _DRIVE_LOCK:
+        for name in names:
+            if name in metas:
+                _FILE_ID_CACHE[(folder_id, name)] = metas[name]["id"]
+            else:
+                _FILE_ID_CACHE.pop((folder_id, name), None)
+    return metas
+
+def _download_file(drive_service, file_id):
+    """Download a Drive file's content into memory"""
+    request = drive_service.files().get_media(fileId=file_id)
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
+    fh.seek(0)
+    return fh
+
+def _media_body(data, mimetype):
+    """Wrap in-memory bytes as an upload body, resumable when they span several chunks"""
+    resumable = len(data) > UPLOAD_CHUNK_SIZE
+    return MediaIoBaseUpload(io.BytesIO(data), mimetype=mimetype, chunksize=UPLOAD_CHUNK_SIZE, resumable=resumable)
+
+def _execute_upload(request, name, progress_callback=None):
+    """Run an upload request; resumable uploads are sent chunk by chunk and resume after transient errors"""
+    if not request.resumable:
+        response = request.execute(num_retries=UPLOAD_RETRIES)
+    else:
+        response = None
+        while response is None:
+            status, response = request.next_chunk(num_retries=UPLOAD_RETRIES)
+            if status:
+                logging.debug(f"Uploading {name}: {int(status.progress() * 100)}%")
+                if progress_callback:
+                    progress_callback(status.progress())
+    if progress_callback:
+        progress_callback(1.0)
+    return response
+
+def _upload_file(drive_service, name, folder_id, media, file_id=None, progress_callback=None):
+    """Update name in folder_id (or create it) from a media body and return its new metadata"""
+    fields = "id, modifiedTime, md5Checksum"
+    file_id = file_id or _lookup_file_id(drive_service, name, folder_id)
+    if file_id:
+        # Update existing file
+        try:
+            request = drive_service.files().update(fileId=file_id, media_body=media, fields=fields)
+            file = _execute_upload(request, name, progress_callback)
+            logging.debug(f"Updated {name} in Google Drive, file_id={file_id}")
+            return file
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            logging.warning(f"Cached file_id={file_id} for {name} no longer exists, creating a new file")
+            _forget_file_id(name, folder_id)
+    # Create new file
+    file_metadata = {
+        "name": name,
+        "parents": [folder_id]
+    }
+    request = drive_service.files().create(body=file_metadata, media_body=media, fields=fields)
+    file = _execute_upload(request, name, progress_callback)
+    with _DRIVE_LOCK:
+        _FILE_ID_CACHE[(folder_id, name)] = file["id"]
+    logging.debug(f"Created new {name} in Google Drive, file_id={file.get('id')}")
+    return file
+
+def read_drive_bytes(name, folder_id):
+    """Return the content of a file in the Drive folder, or None if it is missing or Drive is unavailable"""
+    try:
+        with drive_client() as drive_service:
+            if not drive_service or not folder_id:
+                return None
+            file_id = _lookup_file_id(drive_service, name, folder_id)
+            if not file_id:
+                return None
+            try:
+                return _download_file(drive_service, file_id).getvalue()
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                _forget_file_id(name, folder_id)
+                return None
+    except Exception as e:
+        logging.error(f"Failed to read {name} from Google Drive: {str(e)}")
+        return None
+
+def write_drive_bytes(name, folder_id, data, mimetype="application/octet-stream"):
+    """Create or replace a file in the Drive folder with data; returns True on success"""
+    try:
+        with drive_client() as drive_service:
+            if not drive_service or not folder_id:
+                return False
+            _upload_file(drive_service, name, folder_id, _media_body(data, mimetype))
+            return True
+    except Exception as e:
+        logging.error(f"Failed to write {name} to Google Drive: {str(e)}")
+        return False
+
+def snapshot_name(excel_file):
+    """Name of the columnar snapshot stored next to a workbook: links.xlsx -> links.parquet"""
+    return f"{os.path.splitext(excel_file)[0]}.parquet"
+
+# Change journal: small edits are appended as JSON lines to <name>.journal.jsonl in the
+# Drive folder and replayed on load; compaction folds them into the base files.
+JOURNAL_MAX_OPS = 500
+JOURNAL_MAX_AGE = 24 * 3600  # seconds before the oldest op forces a compaction
+_JOURNAL_LOCK = threading.Lock()
+_JOURNAL_CACHE = {}  # journal file id -> (version, parsed ops)
+
+def journal_name(excel_file):
+    """Name of the change journal stored next to a workbook: links.xlsx -> links.journal.jsonl"""
+    return f"{os.path.splitext(excel_file)[0]}.journal.jsonl"
+
+def _json_default(value):
+    """Serialize numpy scalars and timestamps in journal rows"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def make_add_ops(rows_df):
+    """Journal ops adding every row of rows_df"""
+    return [{"op": "add", "row": row} for row in rows_df.to_dict("records")]
+
+def make_delete_op(link_ids):
+    """Journal op deleting the given link_ids"""
+    return {"op": "delete", "link_ids": [str(link_id) for link_id in link_ids]}
+
+def make_update_op(link_id, fields):
+    """Journal op setting fields on one link"""
+    return {"op": "update", "link_id": str(link_id), "fields": dict(fields)}
+
+def apply_ops(df, ops):
+    """Replay journal ops on a library DataFrame; replay is idempotent by link_id"""
+    if not ops:
+        return df
+    upserts = {}
+    deleted = set()
+    updates = {}
+    for op in ops:
+        if op["op"] == "add":
+            upserts[op["row"]["link_id"]] = dict(op["row"])
+            deleted.discard(op["row"]["link_id"])
+        elif op["op"] == "delete":
+            for link_id in op["link_ids"]:
+                deleted.add(link_id)
+                upserts.pop(link_id, None)
+                updates.pop(link_id, None)
+        elif op["op"] == "update":
+            updates.setdefault(op["link_id"], {}).update(op["fields"])
+    
+    result = df
+    if deleted and "link_id" in result.columns:
+        result = result[~result["link_id"].isin(deleted)]
+    if upserts:
+        added = pd.DataFrame(list(upserts.values()))
+        if "link_id" in result.columns:
+            # Rows already in the base were folded in by a compaction; keep the base copy
+            added = added[~added["link_id"].isin(result["link_id"])]
+        if not added.empty:
+            result = added if result.empty else pd.concat([result, added], ignore_index=True)
+    if updates and "link_id" in result.columns:
+        result = result.copy()
+        # One pass per updated column rather than one per link, for bulk updates such as re-dedupe
+        by_column = {}
+        for link_id, fields in updates.items():
+            for col, value in fields.items():
+                by_column.setdefault(col, {})[link_id] = value
+        for col, values in by_column.items():
+            mask = result["link_id"].isin(values.keys())
+            result.loc[mask, col] = result.loc[mask, "link_id"].map(values)
+    return result.reset_index(drop=True)
+
+def _read_journal(drive_service, journal_meta):
+    """Download and parse a journal file into a list of ops"""
+    if not journal_meta:
+        return []
+    version = _file_version(journal_meta)
+    with _READ_CACHE_LOCK:
+        cached = _JOURNAL_CACHE.get(journal_meta["id"])
+        if cached and cached[0] == version:
+            return list(cached[1])
+    data = _download_file(drive_service, journal_meta["id"]).getvalue().decode("utf-8")
+    journal = [json.loads(line) for line in data.splitlines() if line.strip()]
+    with _READ_CACHE_LOCK:
+        _JOURNAL_CACHE[journal_meta["id"]] = (version, journal)
+    return list(journal)
+
+def write_changes(df, excel_file, folder_id, ops, progress_callback=None):
+    """Append ops to the Drive journal (upload cost O(change)), compacting into the base files when it grows; raises on failure"""
+    with drive_client() as drive_service:
+        if not drive_service:
+            raise RuntimeError("Google Drive service unavailable")
+        if not folder_id:
+            raise RuntimeError("GOOGLE_DRIVE_FOLDER_ID not configured")
+    
+        with _JOURNAL_LOCK:
+            metas = _get_files_meta(drive_service, [excel_file, snapshot_name(excel_file), journal_name(excel_file)], folder_id)
+            journal_meta = metas.get(journal_name(excel_file))
+            base_meta = _base_meta(metas, excel_file)
+            if not base_meta:
+                # Nothing to replay on top of yet: write the first base file
+                write_library(df, excel_file, folder_id, progress_callback)
+                return
+        
+            journal = _read_journal(drive_service, journal_meta)
+            now = datetime.now()
+            journal += [dict(op, ts=now.strftime("%Y-%m-%d %H:%M:%S")) for op in ops]
+            oldest = datetime.strptime(journal[0]["ts"], "%Y-%m-%d %H:%M:%S")
+            if len(journal) >= JOURNAL_MAX_OPS or (now - oldest).total_seconds() >= JOURNAL_MAX_AGE:
+                logging.debug(f"Compacting {len(journal)} journal ops into {excel_file}")
+                write_library(df, excel_file, folder_id, progress_callback)
+                return
+        
+            data = "\n".join(json.dumps(op, default=_json_default) for op in journal).encode("utf-8")
+            journal_meta = _upload_file(drive_service, journal_name(excel_file), folder_id, _media_body(data, "application/x-ndjson"))
+            with _READ_CACHE_LOCK:
+                _JOURNAL_CACHE[journal_meta["id"]] = (_file_version(journal_meta), list(journal))
+                cached = _READ_CACHE.get((folder_id, excel_file))
+            # Cache what Drive now holds (base + journal), not df: it may carry ops queued after these
+            if cached and cached["base_version"] == _file_version(base_meta) and len(journal) - len(ops) >= cached["journal_len"]:
+                persisted = apply_ops(cached["df"].copy(), journal[cached["journal_len"]:])
+                _cache_store(excel_file, folder_id, base_meta, journal_meta, len(journal), persisted)
+            else:
+                bump_data_version(excel_file, folder_id)  # _cache_store bumps it otherwise
+        logging.debug(f"Appended {len(ops)} ops to {journal_name(excel_file)} ({len(journal)} pending, {len(data)} bytes)")
+
+def record_changes(df, excel_file, folder_id, ops):
+    """Persist edits as journal ops; compact into the base files when the journal grows"""
+    try:
+        drive_service_available = drive_available()
+        st.session_state["local_df"] = df  # Always save to session state
+        bump_data_version(excel_file, folder_id)
+        
+        if not drive_service_available or not folder_id:
+            return save_data(df, excel_file, folder_id)
+        
+        write_changes(df, excel_file, folder_id, ops)
+        return True
+    except Exception as e:
+        logging.error(f"Failed to record changes for {excel_file}: {str(e)}")
+        st.error(f"❌ Failed to save {excel_file} to Google Drive. Saved locally.")
+        return True
+
+def _base_meta(metas, excel_file):
+    """Pick the base file to load: the Parquet snapshot unless the workbook is newer"""
+    file_meta = metas.get(excel_file)
+    snapshot_meta = metas.get(snapshot_name(excel_file)) if PARQUET_AVAILABLE else None
+    # Use the snapshot unless the workbook was changed after it (e.g. edited by hand in Drive)
+    if snapshot_meta and (not file_meta or snapshot_meta.get("modifiedTime", "") >= file_meta.get("modifiedTime", "")):
+        return snapshot_meta
+    return file_meta
+
+# Process-wide read cache: (folder_id, excel_file) -> {"version": ..., "df": DataFrame}
+_READ_CACHE = {}
+_READ_CACHE_LOCK = threading.Lock()
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+# Ops accepted by the save queue but not yet written to Drive, overlaid on every load
+_PENDING_OPS = {}  # (folder_id, excel_file) -> [op, ...]
+# Bumped whenever a library's contents may have changed; keys memoized work such as exports
+_DATA_VERSIONS = {}  # (folder_id, excel_file) -> counter
+
+def bump_data_version(excel_file, folder_id):
+    """Mark a library's contents as changed"""
+    with _READ_CACHE_LOCK:
+        _DATA_VERSIONS[(folder_id, excel_file)] = _DATA_VERSIONS.get((folder_id, excel_file), 0) + 1
+
+def get_data_version(excel_file, folder_id):
+    """Counter that changes whenever the library's contents change in this process"""
+    with _READ_CACHE_LOCK:
+        return _DATA_VERSIONS.get((folder_id, excel_file), 0)
+
+def add_pending_ops(excel_file, folder_id, ops):
+    """Remember ops until the save queue has written them"""
+    with _READ_CACHE_LOCK:
+        _PENDING_OPS.setdefault((folder_id, excel_file), []).extend(ops)
+        version = _DATA_VERSIONS[(folder_id, excel_file)] = _DATA_VERSIONS.get((folder_id, excel_file), 0) + 1
+    follow_ops(excel_file, folder_id, ops, version)
+
+def clear_pending_ops(excel_file, folder_id, ops):
+    """Forget pending ops once they are in Drive; matched by identity, so ops queued meanwhile stay"""
+    written = {id(op) for op in ops}
+    with _READ_CACHE_LOCK:
+        pending = _PENDING_OPS.get((folder_id, excel_file), [])
+        pending[:] = [op for op in pending if id(op) not in written]
+
+def _with_pending_ops(df, excel_file, folder_id):
+    """Replay unsaved ops on a loaded frame (ops are idempotent, so overlap with Drive is harmless)"""
+    with _READ_CACHE_LOCK:
+        pending = list(_PENDING_OPS.get((folder_id, excel_file), []))
+    return apply_ops(df, pending) if pending else df
+
+def _file_version(file_meta):
+    """Build a cache version key from Drive file metadata"""
+    if not file_meta:
+        return None
+    return (file_meta.get("id"), file_meta.get("modifiedTime"), file_meta.get("md5Checksum"))
+
+def _cache_store(excel_file, folder_id, base_meta, journal_meta, journal_len, df):
+    """Remember a DataFrame as the current contents of a library (base file + replayed journal)"""
+    with _READ_CACHE_LOCK:
+        _READ_CACHE[(folder_id, excel_file)] = {
+            "version": (_file_version(base_meta), _file_version(journal_meta)),
+            "base_version": _file_version(base_meta),
+            "journal_len": journal_len,
+            "df": df.copy()
+        }
+        _DATA_VERSIONS[(folder_id, excel_file)] = _DATA_VERSIONS.get((folder_id, excel_file), 0) + 1
+
+def get_cache_stats():
+    """Return read cache hit/miss counters"""
+    with _READ_CACHE_LOCK:
+        return dict(CACHE_STATS, entries=len(_READ_CACHE))
+
+def read_library(excel_file, folder_id):
+    """Return the library with queued edits applied, or None if it does not exist yet; raises on failure"""
+    with drive_client() as drive_service:
+        if not drive_service:
+            raise RuntimeError("Google Drive service unavailable")
+        if not folder_id:
+            raise RuntimeError("GOOGLE_DRIVE_FOLDER_ID not configured")
+    
+        # One metadata call covers the workbook, its Parquet snapshot and the change journal
+        metas = _get_files_meta(drive_service, [excel_file, snapshot_name(excel_file), journal_name(excel_file)], folder_id)
+        base_meta = _base_meta(metas, excel_file)
+        journal_meta = metas.get(journal_name(excel_file))
+    
+        if not base_meta:
+            logging.info(f"No file named {excel_file} found in Drive folder")
+            with _READ_CACHE_LOCK:
+                pending = bool(_PENDING_OPS.get((folder_id, excel_file)))
+            if pending:
+                # A new library whose first edits are still queued
+                return _with_pending_ops(pd.DataFrame(columns=[
+                    "link_id", "url", "title", "description", "tags",
+                    "created_at", "updated_at", "priority", "number", "is_duplicate"
+                ]), excel_file, folder_id)
+            return None
+    
+        # Skip the download and parse when the Drive files are unchanged
+        version = (_file_version(base_meta), _file_version(journal_meta))
+        with _READ_CACHE_LOCK:
+            cached = _READ_CACHE.get((folder_id, excel_file))
+            if cached and cached["version"] == version:
+                CACHE_STATS["hits"] += 1
+                df = cached["df"].copy()
+            else:
+                CACHE_STATS["misses"] += 1
+                df = None
+        if df is not None:
+            logging.debug(f"Read cache hit for {excel_file}: {len(df)} rows")
+            return _with_pending_ops(df, excel_file, folder_id)
+    
+        journal = _read_journal(drive_service, journal_meta)
+        if cached and cached["base_version"] == version[0] and len(journal) >= cached["journal_len"]:
+            # Only the journal grew: replay the new ops on the cached frame
+            df = apply_ops(cached["df"].copy(), journal[cached["journal_len"]:])
+        else:
+            fh = _download_file(drive_service, base_meta["id"])
+            if base_meta["name"].endswith(".parquet"):
+                df = pd.read_parquet(fh, engine="pyarrow")
+            else:
+                df = pd.read_excel(fh, engine="openpyxl")
+            df = apply_ops(df, journal)
+        # Normalize column types
+        if "tags" in df.columns:
+            df["tags"] = df["tags"].apply(lambda x: str(x) if pd.notnull(x) else "")
+        if "is_duplicate" in df.columns:
+            df["is_duplicate"] = df["is_duplicate"].astype(bool)
+        _cache_store(excel_file, folder_id, base_meta, journal_meta, len(journal), df)
+        logging.debug(f"Loaded {base_meta['name']} + {len(journal)} journal ops from Google Drive: {len(df)} rows")
+        return _with_pending_ops(df, excel_file, folder_id)
+
 def load_data(excel_file, folder_id):
     """Load data from Google Drive or fallback to session state"""
     try:
-        drive_service = get_drive_service()
-        if not drive_service:
+        if not drive_available():
             logging.warning(f"Drive service unavailable for {excel_file}, checking session state")
             return st.session_state.get("local_df", pd.DataFrame(columns=[
                 "link_id", "url", "title", "description", "tags",
@@ -74,34 +551,13 @@ def load_data(excel_file, folder_id):
                 "created_at", "updated_at", "priority", "number", "is_duplicate"
             ]))
         
-        query = f"name='{excel_file}' and '{folder_id}' in parents and trashed=false"
-        response = drive_service.files().list(q=query, fields="files(id, name)").execute()
-        files = response.get("files", [])
-        
-        if not files:
-            logging.info(f"No file named {excel_file} found in Drive folder")
+        df = read_library(excel_file, folder_id)
+        if df is None:
             return st.session_state.get("local_df", pd.DataFrame(columns=[
                 "link_id", "url", "title", "description", "tags",
                 "created_at", "updated_at", "priority", "number", "is_duplicate"
             ]))
-        
-        file_id = files[0]["id"]
-        request = drive_service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        
-        fh.seek(0)
-        df = pd.read_excel(fh, engine="openpyxl")
-        # Normalize column types
-        if "tags" in df.columns:
-            df["tags"] = df["tags"].apply(lambda x: str(x) if pd.notnull(x) else "")
-        if "is_duplicate" in df.columns:
-            df["is_duplicate"] = df["is_duplicate"].astype(bool)
         st.session_state["local_df"] = df  # Cache in session state
-        logging.debug(f"Loaded {excel_file} from Google Drive: {len(df)} rows")
         return df
     except Exception as e:
         logging.error(f"Failed to load data from Drive for {excel_file}: {str(e)}")
@@ -111,82 +567,108 @@ def load_data(excel_file, folder_id):
             "created_at", "updated_at", "priority", "number", "is_duplicate"
         ]))
 
+def _prepare_output(df):
+    """Add any missing library columns to df and return the output frame in column order"""
+    # Ensure all required columns are present
+    required_columns = [
+        "link_id", "url", "title", "description", "tags",
+        "created_at", "updated_at", "priority", "number", "is_duplicate"
+    ]
+    for col in required_columns:
+        if col not in df.columns:
+            if col == "tags":
+                df[col] = ""
+            elif col == "is_duplicate":
+                df[col] = False
+            elif col == "link_id":
+                df[col] = [str(uuid.uuid4()) for _ in range(len(df))]
+            else:
+                df[col] = ""
+    
+    # Normalize column types
+    df["tags"] = df["tags"].apply(lambda x: str(x) if pd.notnull(x) else "")
+    df["is_duplicate"] = df["is_duplicate"].astype(bool)
+    
+    # Create output DataFrame with desired column order
+    return df[required_columns].copy()
+
+def write_library(df, excel_file, folder_id, progress_callback=None):
+    """Upload the full library (workbook and Parquet snapshot) and clear the journal; raises on failure"""
+    with drive_client() as drive_service:
+        if not drive_service:
+            raise RuntimeError("Google Drive service unavailable")
+        if not folder_id:
+            raise RuntimeError("GOOGLE_DRIVE_FOLDER_ID not configured")
+        output_df = _prepare_output(df)
+    
+        # Build the workbook in memory: no scratch file for concurrent saves to race on
+        buffer = io.BytesIO()
+        write_xlsx(output_df, buffer)
+        workbook_bytes = buffer.getvalue()
+        snapshot_bytes = b""
+        if PARQUET_AVAILABLE:
+            try:
+                snapshot_buffer = io.BytesIO()
+                write_parquet(output_df, snapshot_buffer)
+                snapshot_bytes = snapshot_buffer.getvalue()
+            except Exception as e:
+                logging.error(f"Failed to build Parquet snapshot for {excel_file}: {str(e)}")
+    
+        # Progress over both uploads, weighted by size
+        total = len(workbook_bytes) + len(snapshot_bytes)
+        def report(done_before, size):
+            if not progress_callback:
+                return None
+            return lambda fraction: progress_callback((done_before + fraction * size) / total)
+    
+        file = _upload_file(drive_service, excel_file, folder_id, _media_body(workbook_bytes, XLSX_MIMETYPE),
+                            progress_callback=report(0, len(workbook_bytes)))
+    
+        # Columnar snapshot for fast loads, written after the workbook so it is at least as fresh
+        if snapshot_bytes:
+            try:
+                file = _upload_file(drive_service, snapshot_name(excel_file), folder_id,
+                                    _media_body(snapshot_bytes, "application/vnd.apache.parquet"),
+                                    progress_callback=report(len(workbook_bytes), len(snapshot_bytes)))
+            except Exception as e:
+                logging.error(f"Failed to save Parquet snapshot for {excel_file}: {str(e)}")
+    
+        # The base files now contain every journaled change
+        journal_id = _lookup_file_id(drive_service, journal_name(excel_file), folder_id)
+        if journal_id:
+            drive_service.files().delete(fileId=journal_id).execute()
+            _forget_file_id(journal_name(excel_file), folder_id)
+    
+        # Our own upload is the new Drive version, so the next load needs no download
+        _cache_store(excel_file, folder_id, file, None, 0, output_df)
+        logging.debug(f"Successfully saved {excel_file} to Google Drive ({total} bytes)")
+
 def save_data(df, excel_file, folder_id):
     """Save DataFrame to Google Drive and session state with link_id and hyperlinked URLs"""
     try:
-        drive_service = get_drive_service()
+        drive_service_available = drive_available()
         st.session_state["local_df"] = df  # Always save to session state
+        bump_data_version(excel_file, folder_id)
         
-        # Ensure all required columns are present
-        required_columns = [
-            "link_id", "url", "title", "description", "tags",
-            "created_at", "updated_at", "priority", "number", "is_duplicate"
-        ]
-        for col in required_columns:
-            if col not in df.columns:
-                if col == "tags":
-                    df[col] = ""
-                elif col == "is_duplicate":
-                    df[col] = False
-                elif col == "link_id":
-                    df[col] = [str(uuid.uuid4()) for _ in range(len(df))]
-                else:
-                    df[col] = ""
-        
-        # Normalize column types
-        df["tags"] = df["tags"].apply(lambda x: str(x) if pd.notnull(x) else "")
-        df["is_duplicate"] = df["is_duplicate"].astype(bool)
-        
-        # Create output DataFrame with desired column order
-        output_df = df[required_columns].copy()
-        
-        if not drive_service:
+        if not drive_service_available:
+            _prepare_output(df)
             logging.error(f"Drive service unavailable for {excel_file}, saved to session state only")
             st.warning(f"⚠️ Saved locally but could not save {excel_file} to Google Drive.")
             return True
         
         if not folder_id:
+            _prepare_output(df)
             logging.error("GOOGLE_DRIVE_FOLDER_ID not found in secrets")
             st.error(f"❌ GOOGLE_DRIVE_FOLDER_ID not found for {excel_file}. Check Streamlit Cloud secrets.")
             return True
         
-        query = f"name='{excel_file}' and '{folder_id}' in parents and trashed=false"
-        response = drive_service.files().list(q=query, fields="files(id, name)").execute()
-        files = response.get("files", [])
-        
-        # Save DataFrame to temporary file with hyperlinks
-        temp_file = f"temp_{excel_file}"
-        with pd.ExcelWriter(temp_file, engine="openpyxl") as writer:
-            output_df.to_excel(writer, index=False, sheet_name="Links")
-            workbook = writer.book
-            worksheet = writer.sheets["Links"]
-            
-            # Add hyperlinks to URL column (column B, since link_id is column A)
-            for idx, url in enumerate(output_df["url"], start=2):
-                worksheet[f"B{idx}"].hyperlink = url
-                worksheet[f"B{idx}"].style = "Hyperlink"
-        
-        file_metadata = {
-            "name": excel_file,
-            "parents": [folder_id]
-        }
-        
-        media = MediaFileUpload(temp_file, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        
-        if files:
-            # Update existing file
-            file_id = files[0]["id"]
-            drive_service.files().update(fileId=file_id, media_body=media).execute()
-            logging.debug(f"Updated {excel_file} in Google Drive, file_id={file_id}")
-        else:
-            # Create new file
-            file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
-            logging.debug(f"Created new {excel_file} in Google Drive, file_id={file.get('id')}")
-        
-        os.remove(temp_file)
-        logging.debug(f"Successfully saved {excel_file} to Google Drive")
+        progress_bar = st.progress(0, text=f"Uploading {excel_file}...")
+        try:
+            write_library(df, excel_file, folder_id, progress_bar.progress)
+        finally:
+            progress_bar.empty()
         return True
     except Exception as e:
         logging.error(f"Failed to save data to Drive for {excel_file}: {str(e)}")
         st.error(f"❌ Failed to save {excel_file} to Google Drive. Saved locally.")
-        return True
\ No newline at end of file
+        return True
@@ -0,0 +1,230 @@
+import io
+import logging
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+import pandas as pd
+
+# Check for pyarrow availability (Parquet export)
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    logging.warning("pyarrow not available, Parquet export disabled")
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXCEL_MAX_HYPERLINKS = 65530  # per worksheet; Excel asks to repair files with more
+
+# XML 1.0 forbids most control characters; openpyxl refuses them too
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name={sheet_name} sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# Style 1 is the pandas to_excel header (bold, thin border, centered); style 2 is Excel's built-in Hyperlink style
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="3">
+<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>
+<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>
+<font><u/><sz val="11"/><color rgb="FF0563C1"/><name val="Calibri"/><family val="2"/></font>
+</fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="2">
+<border><left/><right/><top/><bottom/><diagonal/></border>
+<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>
+</borders>
+<cellStyleXfs count="2">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>
+<xf numFmtId="0" fontId="2" fillId="0" borderId="0"/>
+</cellStyleXfs>
+<cellXfs count="3">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1"><alignment horizontal="center" vertical="top"/></xf>
+<xf numFmtId="0" fontId="2" fillId="0" borderId="0" xfId="1" applyFont="1"/>
+</cellXfs>
+<cellStyles count="2"><cellStyle name="Normal" xfId="0" builtinId="0"/><cellStyle name="Hyperlink" xfId="1" builtinId="8"/></cellStyles>
+</styleSheet>"""
+
+_SHEET_START = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">"""
+
+_RELS_START = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">"""
+
+def _column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _text(value):
+    return escape(_ILLEGAL_XML_CHARS.sub("", value))
+
+def _cell_xml(ref, value, style=0):
+    """One <c> element; empty string for missing values (NaN/None), which Excel reads as blank"""
+    style_attr = f' s="{style}"' if style else ""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            return ""
+        return f'<c r="{ref}"{style_attr}><v>{value!r}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{_text(str(value))}</t></is></c>'
+
+def write_xlsx(df, fh, link_column="url", sheet_name="Links", chunk_rows=1000):
+    """Stream df into an .xlsx file object row by row, with link_column cells as clickable hyperlinks"""
+    # Rows are rendered straight into the zip stream in chunks: memory stays flat and nothing touches disk
+    columns = list(df.columns)
+    letters = [_column_letter(i) for i in range(len(columns))]
+    link_index = columns.index(link_column) if link_column in columns else None
+    # Column-wise tolist() yields plain Python values, far cheaper than per-row pandas access
+    values = [df[col].tolist() for col in columns]
+    links = []
+    unlinked = 0
+
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(sheet_name=quoteattr(sheet_name)))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", _STYLES)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            header = "".join(_cell_xml(f"{letters[i]}1", str(name), 1) for i, name in enumerate(columns))
+            # The dimension lets streaming readers size the sheet before reading it
+            dimension = f'<dimension ref="A1:{letters[-1]}{len(df) + 1}"/>' if columns else ""
+            sheet.write(f'{_SHEET_START}{dimension}<sheetData><row r="1">{header}</row>'.encode("utf-8"))
+            chunk = []
+            for row_number, row in enumerate(zip(*values), start=2):
+                cells = []
+                for i, value in enumerate(row):
+                    if i == link_index and isinstance(value, str) and value:
+                        ref = f"{letters[i]}{row_number}"
+                        if len(links) < EXCEL_MAX_HYPERLINKS:
+                            links.append((ref, value))
+                            cells.append(_cell_xml(ref, value, 2))
+                        else:
+                            unlinked += 1
+                            cells.append(_cell_xml(ref, value))
+                    else:
+                        cells.append(_cell_xml(f"{letters[i]}{row_number}", value))
+                chunk.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+                if len(chunk) >= chunk_rows:
+                    sheet.write("".join(chunk).encode("utf-8"))
+                    chunk = []
+            sheet.write("".join(chunk).encode("utf-8"))
+            sheet.write(b"</sheetData>")
+            if links:
+                sheet.write(b"<hyperlinks>")
+                for start in range(0, len(links), chunk_rows):
+                    sheet.write("".join(
+                        f'<hyperlink ref="{ref}" r:id="rId{n}"/>'
+                        for n, (ref, _) in enumerate(links[start:start + chunk_rows], start=start + 1)
+                    ).encode("utf-8"))
+                sheet.write(b"</hyperlinks>")
+            sheet.write(b"</worksheet>")
+
+        if links:
+            with archive.open("xl/worksheets/_rels/sheet1.xml.rels", "w", force_zip64=True) as rels:
+                rels.write(_RELS_START.encode("utf-8"))
+                for start in range(0, len(links), chunk_rows):
+                    rels.write("".join(
+                        f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink" '
+                        f'Target={quoteattr(_ILLEGAL_XML_CHARS.sub("", url))} TargetMode="External"/>'
+                        for n, (_, url) in enumerate(links[start:start + chunk_rows], start=start + 1)
+                    ).encode("utf-8"))
+                rels.write(b"</Relationships>")
+
+    if unlinked:
+        logging.warning(f"{unlinked} URLs exported as plain text: Excel allows {EXCEL_MAX_HYPERLINKS} hyperlinks per sheet")
+    logging.debug(f"Exported {len(df)} rows to {sheet_name} sheet with {len(links)} hyperlinks")
+
+def write_csv(df, fh, chunk_rows=10000):
+    """Stream df into a binary file object as UTF-8 CSV, one slice at a time"""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        fh.write(df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode("utf-8"))
+    logging.debug(f"Exported {len(df)} rows as CSV")
+
+def write_jsonl(df, fh, chunk_rows=10000):
+    """Stream df into a binary file object as JSON Lines, one slice at a time"""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].to_json(orient="records", lines=True, force_ascii=False)
+        fh.write(chunk.encode("utf-8"))
+        if not chunk.endswith("\n"):
+            fh.write(b"\n")
+    logging.debug(f"Exported {len(df)} rows as JSON Lines")
+
+def _parquet_chunk(df):
+    """Coerce mixed-type object columns so every chunk matches the string schema"""
+    chunk = df.copy()
+    for col in chunk.columns:
+        if chunk[col].dtype == object:
+            chunk[col] = chunk[col].map(lambda x: str(x) if pd.notnull(x) else None)
+    return chunk
+
+def write_parquet(df, fh, chunk_rows=65536):
+    """Stream df into a file object as Parquet, one row group per slice"""
+    # A numeric-looking "number" column stays numeric; everything else untyped becomes strings
+    if "number" in df.columns and df["number"].dtype == object:
+        try:
+            df = df.assign(number=pd.to_numeric(df["number"]))
+        except (TypeError, ValueError):
+            pass
+    fields = []
+    for col in df.columns:
+        if df[col].dtype == object:
+            fields.append(pyarrow.field(str(col), pyarrow.string()))
+        else:
+            fields.append(pyarrow.field(str(col), pyarrow.from_numpy_dtype(df[col].dtype)))
+    schema = pyarrow.schema(fields)
+    with pyarrow.parquet.ParquetWriter(fh, schema) as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            chunk = _parquet_chunk(df.iloc[start:start + chunk_rows])
+            writer.write_table(pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    logging.debug(f"Exported {len(df)} rows as Parquet")
+
+# Download formats offered in the Export Data tab: label -> (extension, mimetype, writer)
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", XLSX_MIMETYPE, write_xlsx),
+    "CSV": ("csv", "text/csv", write_csv),
+    "JSON Lines": ("jsonl", "application/x-ndjson", write_jsonl),
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet", write_parquet)
+
+def export_bytes(df, fmt):
+    """Serialize df in one of EXPORT_FORMATS and return the file content"""
+    buffer = io.BytesIO()
+    EXPORT_FORMATS[fmt][2](df, buffer)
+    return buffer.getvalue()
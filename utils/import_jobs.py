@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from utils.bookmark_readers import iter_bookmarks
+from utils.config import get_cache_dir
+from utils.data_manager import apply_ops, make_add_ops, read_library, write_changes
+from utils.link_operations import import_bookmark_batches
+from utils.url_index import get_url_index
+
+# Imports run in background threads; each job keeps its upload and a checkpoint under
+# CACHE_DIR/import_jobs/<job_id>/ so it survives reruns and can be resumed after a restart
+COMMIT_RETRIES = 3
+FINISHED_STATUSES = ["completed", "cancelled", "failed", "interrupted"]
+RESUMABLE_STATUSES = ["cancelled", "failed", "interrupted"]
+
+_JOBS_LOCK = threading.Lock()
+_RUNNING = {}  # job_id -> {"cancel": Event, "state": live state dict}
+
+def _jobs_root():
+    return get_cache_dir("import_jobs")
+
+def _job_dir(job_id):
+    return os.path.join(_jobs_root(), job_id)
+
+def _upload_path(state):
+    return os.path.join(_job_dir(state["job_id"]), f"upload.{state['file_type']}")
+
+def _save_state(state):
+    """Write the job's checkpoint atomically"""
+    state["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    path = os.path.join(_job_dir(state["job_id"]), "job.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def _load_state(job_id):
+    try:
+        with open(os.path.join(_job_dir(job_id), "job.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to read import job {job_id}: {str(e)}")
+        return None
+
+def _commit_batch(excel_file, folder_id, new_rows):
+    """Append one batch to the library's journal, retrying transient Drive errors"""
+    ops = make_add_ops(new_rows)
+    for attempt in range(1, COMMIT_RETRIES + 1):
+        try:
+            df = read_library(excel_file, folder_id)
+            df = apply_ops(df if df is not None else new_rows.iloc[0:0], ops)
+            write_changes(df, excel_file, folder_id, ops)
+            return
+        except Exception as e:
+            if attempt == COMMIT_RETRIES:
+                raise
+            logging.warning(f"Import batch commit failed (attempt {attempt}): {str(e)}")
+            time.sleep(2 ** attempt)
+
+def _run_job(job_id, cancel, state):
+    """Stream the job's upload through fetch/tag batches, committing and checkpointing each batch"""
+    state.update(status="running", error=None)
+    _save_state(state)
+    excel_file, folder_id = state["excel_file"], state["folder_id"]
+    skip = state["links_read"]
+    consumed = {"links": 0}
+
+    def report(fraction):
+        state["read_fraction"] = fraction
+
+    def processed(count, read):
+        # Links committed before an interruption are not read again, so they are counted up front
+        state.update(processed=skip + count, read=skip + read)
+
+    try:
+        with open(_upload_path(state), "rb") as fh:
+            df = read_library(excel_file, folder_id)
+            url_index = get_url_index(df, excel_file, folder_id)
+
+            def links():
+                for position, link in enumerate(iter_bookmarks(fh, report), start=1):
+                    if cancel.is_set():
+                        return
+                    consumed["links"] = position
+                    if position <= skip:
+                        continue  # committed before the job was interrupted
+                    # Stable ids make re-committing a batch after a crash a no-op
+                    link["link_id"] = str(uuid.uuid5(uuid.NAMESPACE_URL, f"import-job/{job_id}/{position}"))
+                    yield link
+
+            for new_rows in import_bookmark_batches(links(), url_index, state["duplicate_action"], excel_file, folder_id,
+                                                    progress_callback=processed):
+                _commit_batch(excel_file, folder_id, new_rows)
+                # Indexed only once in the library: a failed commit must not leave phantom links behind
+                url_index.add(new_rows)
+                state["links_read"] = consumed["links"]
+                state["imported"] += len(new_rows)
+                _save_state(state)
+                logging.debug(f"Import job {job_id}: {state['imported']} links imported, {state['links_read']} read")
+            if not consumed["links"] and not cancel.is_set():
+                raise ValueError("No valid URLs found in the uploaded file.")
+
+        if cancel.is_set():
+            state["status"] = "cancelled"
+        else:
+            state.update(status="completed", links_read=consumed["links"], read_fraction=1.0)
+            os.remove(_upload_path(state))
+        _save_state(state)
+        logging.info(f"Import job {job_id} {state['status']}: {state['imported']} links imported")
+    except Exception as e:
+        state.update(status="failed", error=str(e))
+        _save_state(state)
+        logging.error(f"Import job {job_id} failed: {str(e)}")
+    finally:
+        with _JOBS_LOCK:
+            _RUNNING.pop(job_id, None)
+
+def _register(state):
+    """Mark a job as running in this process, so listings never report it as interrupted"""
+    cancel = threading.Event()
+    with _JOBS_LOCK:
+        _RUNNING[state["job_id"]] = {"cancel": cancel, "state": state}
+    return cancel
+
+def _start_thread(state, cancel=None):
+    cancel = cancel or _register(state)
+    thread = threading.Thread(target=_run_job, args=(state["job_id"], cancel, state), name=f"import-{state['job_id'][:8]}", daemon=True)
+    thread.start()
+
+def start_import_job(uploaded_file, excel_file, folder_id, duplicate_action):
+    """Save the upload next to a new job checkpoint and start importing it in the background"""
+    job_id = uuid.uuid4().hex
+    state = {
+        "job_id": job_id,
+        "excel_file": excel_file,
+        "folder_id": folder_id,
+        "file_name": uploaded_file.name,
+        "file_type": uploaded_file.name.split(".")[-1].lower(),
+        "duplicate_action": duplicate_action,
+        "status": "queued",
+        "links_read": 0,
+        "imported": 0,
+        "processed": 0,
+        "read": 0,
+        "read_fraction": 0.0,
+        "error": None,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    cancel = _register(state)
+    os.makedirs(_job_dir(job_id), exist_ok=True)
+    uploaded_file.seek(0)
+    with open(_upload_path(state), "wb") as f:
+        shutil.copyfileobj(uploaded_file, f)
+    _save_state(state)
+    _start_thread(state, cancel)
+    logging.debug(f"Started import job {job_id} for {uploaded_file.name} into {excel_file}")
+    return job_id
+
+def list_import_jobs(excel_file, folder_id):
+    """Return the library's import jobs, newest first; jobs left running by a previous process show as interrupted"""
+    jobs = []
+    for job_id in os.listdir(_jobs_root()):
+        with _JOBS_LOCK:
+            running = _RUNNING.get(job_id)
+            state = dict(running["state"]) if running else None
+        if state is None and not os.path.exists(os.path.join(_job_dir(job_id), "job.json")):
+            continue
+        if state is None:
+            state = _load_state(job_id)
+            if state is None:
+                continue
+            if state["status"] not in FINISHED_STATUSES:
+                state["status"] = "interrupted"
+                _save_state(state)
+        if state["excel_file"] == excel_file and state["folder_id"] == folder_id:
+            jobs.append(state)
+    return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+def cancel_import_job(job_id):
+    """Ask a running job to stop after its current batch; committed batches are kept"""
+    with _JOBS_LOCK:
+        running = _RUNNING.get(job_id)
+    if running:
+        running["cancel"].set()
+        logging.debug(f"Cancelling import job {job_id}")
+
+def resume_import_job(job_id):
+    """Restart a cancelled, failed or interrupted job from its last checkpoint"""
+    with _JOBS_LOCK:
+        if job_id in _RUNNING:
+            return False
+    state = _load_state(job_id)
+    if not state or state["status"] not in RESUMABLE_STATUSES + ["running", "queued"] or not os.path.exists(_upload_path(state)):
+        return False
+    _start_thread(state)
+    logging.debug(f"Resuming import job {job_id} after {state['links_read']} links")
+    return True
+
+def dismiss_import_job(job_id):
+    """Delete a finished job's checkpoint and upload"""
+    with _JOBS_LOCK:
+        if job_id in _RUNNING:
+            return
+    shutil.rmtree(_job_dir(job_id), ignore_errors=True)
@@ -7,7 +7,21 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 import requests
 from bs4 import BeautifulSoup
+import requests.adapters
 import requests.exceptions
+import threading
+import time
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from urllib.parse import urlparse
+from utils.model_store import data_version, load_artifact, save_artifact
+from utils.tag_rules import get_rule_engine
+from utils.online_tagger import get_online_tagger, learn_tags
+from utils.metadata_cache import get_cached_metadata, store_metadata, touch_metadata
+from utils.content_archive import ARCHIVE_PAGE_TEXT, is_archived, archive_page_text
+from utils.bookmark_readers import iter_bookmarks
+from utils.url_index import get_url_index, duplicate_flags
+from utils.url_utils import canonical_url
 
 # Check for newspaper3k availability
 try:
@@ -17,21 +31,32 @@ except ImportError:
     NEWSPAPER_AVAILABLE = False
     logging.warning("newspaper3k not available, using BeautifulSoup fallback")
 
+# Check for lxml availability (fast <head> metadata extraction)
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+    logging.warning("lxml not available, metadata fetches will download full pages")
+
 # Lazy-load spaCy and classifier
 NLP = None
 VECTORIZER = None
 CLASSIFIER = None
 
+_MODEL_LOCK = threading.RLock()
+
 def init_nlp():
     """Initialize spaCy model"""
     global NLP
-    if NLP is None:
-        try:
-            import spacy
-            NLP = spacy.load("en_core_web_sm", disable=["parser", "ner"])
-        except Exception as e:
-            logging.error(f"Failed to load spaCy model: {str(e)}")
-            NLP = False
+    with _MODEL_LOCK:
+        if NLP is None:
+            try:
+                import spacy
+                NLP = spacy.load("en_core_web_sm", disable=["parser", "ner"])
+            except Exception as e:
+                logging.error(f"Failed to load spaCy model: {str(e)}")
+                NLP = False
     return NLP
 
 # Hardcoded labeled dataset for training
@@ -46,60 +71,273 @@ TRAINING_DATA = [
 ]
 
 def train_classifier():
-    """Train classifier lazily"""
+    """Load the classifier artifact for the current TRAINING_DATA, fitting and saving it if missing"""
     global VECTORIZER, CLASSIFIER
-    if VECTORIZER is None or CLASSIFIER is None:
-        texts = [item["text"] for item in TRAINING_DATA]
-        tags = [item["tag"] for item in TRAINING_DATA]
-        VECTORIZER = TfidfVectorizer(max_features=1000, stop_words="english")
-        X = VECTORIZER.fit_transform(texts)
-        CLASSIFIER = LogisticRegression(random_state=42)
-        CLASSIFIER.fit(X, tags)
+    with _MODEL_LOCK:
+        if VECTORIZER is None or CLASSIFIER is None:
+            version = data_version(TRAINING_DATA)
+            artifact = load_artifact("tag_classifier", version)
+            if artifact:
+                VECTORIZER, CLASSIFIER = artifact["vectorizer"], artifact["classifier"]
+            else:
+                texts = [item["text"] for item in TRAINING_DATA]
+                tags = [item["tag"] for item in TRAINING_DATA]
+                vectorizer = TfidfVectorizer(max_features=1000, stop_words="english")
+                X = vectorizer.fit_transform(texts)
+                classifier = LogisticRegression(random_state=42)
+                classifier.fit(X, tags)
+                save_artifact("tag_classifier", version, {"vectorizer": vectorizer, "classifier": classifier})
+                VECTORIZER, CLASSIFIER = vectorizer, classifier
+                logging.debug(f"Trained tag classifier version {version}")
     return VECTORIZER, CLASSIFIER
 
-@st.cache_data
-def fetch_metadata(url):
-    """Fetch metadata for a given URL, with caching and improved error handling"""
+def warm_up_models():
+    """Load spaCy and the tag classifier ahead of the first request"""
+    started = time.monotonic()
+    init_nlp()
+    train_classifier()
+    logging.info(f"Models warmed up in {time.monotonic() - started:.2f}s")
+
+# Concurrent metadata fetching for bookmark imports
+FETCH_MAX_WORKERS = 16
+FETCH_PER_HOST_LIMIT = 4
+FETCH_TIMEOUT = 10
+FETCH_DEADLINE = 600  # seconds for one fetch_metadata_batch call
+HEAD_MAX_BYTES = 64 * 1024  # stop reading at </head> or after this many bytes
+BODY_MAX_BYTES = 5 * 1024 * 1024  # cap for the full-page fallback
+FETCH_CHUNK_SIZE = 16 * 1024
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+_FETCH_EXECUTOR = None
+_FETCH_LOCK = threading.Lock()
+_HOST_SLOTS = {}
+_SESSION_LOCAL = threading.local()
+
+def _get_http_session():
+    """Return this thread's keep-alive requests session"""
+    session = getattr(_SESSION_LOCAL, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(FETCH_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=FETCH_PER_HOST_LIMIT)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _SESSION_LOCAL.session = session
+    return session
+
+def _get_fetch_executor():
+    """Return the process-wide thread pool used for metadata fetches"""
+    global _FETCH_EXECUTOR
+    with _FETCH_LOCK:
+        if _FETCH_EXECUTOR is None:
+            _FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="metadata-fetch")
+        return _FETCH_EXECUTOR
+
+def _host_slot(url):
+    """Return the semaphore limiting concurrent requests to the URL's host"""
+    host = urlparse(url).netloc.lower()
+    with _FETCH_LOCK:
+        if host not in _HOST_SLOTS:
+            _HOST_SLOTS[host] = threading.Semaphore(FETCH_PER_HOST_LIMIT)
+        return _HOST_SLOTS[host]
+
+_HEAD_END = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+def _read_head(chunks):
+    """Read response chunks until the end of <head> or HEAD_MAX_BYTES"""
+    head = b""
+    for chunk in chunks:
+        # Only rescan the new chunk plus enough overlap to catch a split "</head>"
+        scan_from = max(0, len(head) - 8)
+        head += chunk
+        if _HEAD_END.search(head, scan_from) or len(head) >= HEAD_MAX_BYTES:
+            break
+    return head
+
+def _decode_html(data, response):
+    """Decode page bytes using the HTTP charset, then a <meta charset>, then UTF-8"""
+    encoding = None
+    if "charset=" in response.headers.get("Content-Type", "").lower():
+        encoding = response.encoding
+    if not encoding:
+        match = _META_CHARSET.search(data[:HEAD_MAX_BYTES])
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        if NEWSPAPER_AVAILABLE:
-            article = Article(url)
-            article.download()
-            article.parse()
-            title = article.title or ""
-            description = article.meta_description or article.text[:200] or ""
-        else:
-            # Fallback to BeautifulSoup
-            response = requests.get(url, headers=headers, timeout=10, verify=True)
+        return data.decode(encoding, errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+def _extract_head_metadata(html):
+    """Pull title and description from <head>, preferring OpenGraph/Twitter card fields"""
+    try:
+        doc = lxml.html.fromstring(_XML_DECLARATION.sub("", html) or "<html></html>")
+    except Exception as e:
+        logging.debug(f"lxml could not parse page head: {str(e)}")
+        return {"title": "", "description": ""}
+    meta = {}
+    for element in doc.iter("meta"):
+        key = (element.get("property") or element.get("name") or "").strip().lower()
+        content = (element.get("content") or "").strip()
+        if key and content and key not in meta:
+            meta[key] = content
+    title_element = doc.find(".//title")
+    page_title = title_element.text_content().strip() if title_element is not None else ""
+    title = meta.get("og:title") or meta.get("twitter:title") or page_title
+    description = meta.get("description") or meta.get("og:description") or meta.get("twitter:description") or ""
+    return {"title": title, "description": description}
+
+def _extract_full_metadata(url, html):
+    """Full-page extraction with newspaper3k or BeautifulSoup, used when <head> has nothing"""
+    if NEWSPAPER_AVAILABLE:
+        article = Article(url)
+        article.download(input_html=html)
+        article.parse()
+        title = article.title or ""
+        description = article.meta_description or article.text[:200] or ""
+    else:
+        # Fallback to BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        title = soup.find("title").text if soup.find("title") else ""
+        description = ""
+        meta_desc = soup.find("meta", attrs={"name": "description"})
+        if meta_desc and meta_desc.get("content"):
+            description = meta_desc["content"]
+    return {"title": title, "description": description}
+
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"]
+
+def _extract_page_text(url, html):
+    """Main text of a page for the content archive, without scripts, navigation and footers"""
+    if NEWSPAPER_AVAILABLE:
+        article = Article(url)
+        article.download(input_html=html)
+        article.parse()
+        if article.text:
+            return article.text
+    if LXML_AVAILABLE:
+        try:
+            doc = lxml.html.fromstring(_XML_DECLARATION.sub("", html) or "<html></html>")
+            for element in doc.xpath("|".join(f"//{tag}" for tag in _BOILERPLATE_TAGS)):
+                element.drop_tree()
+            body = doc.find(".//body")
+            return " ".join((body if body is not None else doc).itertext())
+        except Exception as e:
+            logging.debug(f"lxml could not parse page body of {url}: {str(e)}")
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(_BOILERPLATE_TAGS):
+        element.decompose()
+    return soup.get_text(" ")
+
+def _fetch_metadata(url, timeout=FETCH_TIMEOUT):
+    """Fetch title and description for a URL, served from or revalidated against the persistent cache;
+    with ARCHIVE_PAGE_TEXT the page's main text is archived too"""
+    cached = get_cached_metadata(url)
+    archive = ARCHIVE_PAGE_TEXT and not is_archived(url)
+    if cached and cached["fresh"] and not archive:
+        return {"title": cached["title"], "description": cached["description"]}
+    # A stale entry beats nothing if the page can't be fetched right now
+    fallback = {"title": cached["title"], "description": cached["description"]} if cached else {"title": "", "description": ""}
+    
+    try:
+        headers = {}
+        # A 304 has no body to archive, so archiving fetches unconditionally
+        if cached and cached["etag"] and not archive:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"] and not archive:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        with _get_http_session().get(url, headers=headers, timeout=timeout, verify=True, stream=True) as response:
+            if response.status_code == 304 and cached:
+                touch_metadata(url)
+                return fallback
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            title = soup.find("title").text if soup.find("title") else ""
-            description = ""
-            meta_desc = soup.find("meta", attrs={"name": "description"})
-            if meta_desc and meta_desc.get("content"):
-                description = meta_desc["content"]
-        return {"title": title, "description": description}
+            
+            # Fast path: stream only the <head> and read title/description/OpenGraph tags from it
+            chunks = response.iter_content(chunk_size=FETCH_CHUNK_SIZE)
+            page = _read_head(chunks)
+            metadata = _extract_head_metadata(_decode_html(page, response)) if LXML_AVAILABLE else None
+            
+            if archive or not metadata or not (metadata["title"] or metadata["description"]):
+                # Slow path: read the rest of the page (bounded) for the archive or the full extractor
+                for chunk in chunks:
+                    page += chunk
+                    if len(page) >= BODY_MAX_BYTES:
+                        break
+                html = _decode_html(page, response)
+                if not metadata or not (metadata["title"] or metadata["description"]):
+                    metadata = _extract_full_metadata(url, html)
+                if archive:
+                    archive_page_text(url, _extract_page_text(url, html))
+            
+            store_metadata(url, metadata, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return metadata
     except requests.exceptions.Timeout:
         logging.error(f"Metadata fetch timed out for {url}")
-        return {"title": "", "description": ""}
+        return fallback
     except requests.exceptions.SSLError as ssl_err:
         logging.error(f"SSL error for {url}: {str(ssl_err)}")
-        return {"title": "", "description": ""}
+        return fallback
     except requests.exceptions.ConnectionError as conn_err:
         logging.error(f"Connection error for {url}: {str(conn_err)}")
-        return {"title": "", "description": ""}
+        return fallback
     except Exception as e:
         logging.error(f"Metadata fetch failed for {url}: {str(e)}")
+        return fallback
+
+@st.cache_data
+def fetch_metadata(url):
+    """Fetch metadata for a given URL, with caching and improved error handling"""
+    return _fetch_metadata(url)
+
+def _fetch_before_deadline(url, deadline_at):
+    """Fetch one URL within its host's concurrency limit, giving up once the deadline has passed"""
+    slot = _host_slot(url)
+    if not slot.acquire(timeout=max(0, deadline_at - time.monotonic())):
         return {"title": "", "description": ""}
+    try:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            return {"title": "", "description": ""}
+        return _fetch_metadata(url, timeout=min(FETCH_TIMEOUT, remaining))
+    finally:
+        slot.release()
+
+def fetch_metadata_batch(urls, progress_callback=None, deadline=FETCH_DEADLINE):
+    """Fetch metadata for many URLs concurrently, returning results in the order of urls"""
+    unique_urls = list(dict.fromkeys(urls))
+    results = {url: {"title": "", "description": ""} for url in unique_urls}
+    if not unique_urls:
+        return []
+    
+    deadline_at = time.monotonic() + deadline
+    executor = _get_fetch_executor()
+    futures = {executor.submit(_fetch_before_deadline, url, deadline_at): url for url in unique_urls}
+    completed = 0
+    try:
+        # Results are collected on the calling thread so progress_callback may touch Streamlit widgets
+        for future in as_completed(futures, timeout=max(0, deadline_at - time.monotonic())):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                logging.error(f"Metadata fetch failed for {futures[future]}: {str(e)}")
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, len(unique_urls))
+    except FuturesTimeoutError:
+        pending = [future for future in futures if not future.done()]
+        for future in pending:
+            future.cancel()
+        logging.warning(f"Metadata fetch deadline reached, skipped {len(pending)} of {len(unique_urls)} URLs")
+    return [results[url] for url in urls]
 
-def save_link(df, url, title, description, tags, priority, number, mode):
+def save_link(df, url, title, description, tags, priority, number, mode, excel_file=None, folder_id=None):
     """Save a new link to the DataFrame"""
     try:
         new_id = str(uuid.uuid4())
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        is_duplicate = url in df["url"].values if not df.empty else False
+        is_duplicate = get_url_index(df, excel_file, folder_id).contains(url)
         
         tags_str = tags if isinstance(tags, str) else tags[0] if tags else ""
         
@@ -129,8 +367,9 @@ def delete_selected_links(df, selected_ids, excel_file, mode, folder_id):
     try:
         updated_df = df[~df["link_id"].isin(selected_ids)].reset_index(drop=True)
         if mode in ["admin", "guest"] and excel_file:
-            from utils.data_manager import save_data
-            if save_data(updated_df, excel_file, folder_id):
+            from utils.data_manager import make_delete_op
+            from utils.save_queue import queue_changes
+            if queue_changes(updated_df, excel_file, folder_id, [make_delete_op(selected_ids)]):
                 logging.debug(f"Data saved to {excel_file} with folder_id={folder_id} after deletion")
             else:
                 logging.error("Failed to save data to Google Drive after deletion")
@@ -142,138 +381,201 @@ def delete_selected_links(df, selected_ids, excel_file, mode, folder_id):
         logging.error(f"Delete links failed: {str(e)}")
         return df
 
-def predict_tag(text, url):
-    """Predict a single tag using classifier or rule-based fallback"""
-    categories = ["News", "Shopping", "Research", "Entertainment", "Cloud", "Education", "Other"]
+def rededupe_links(df, excel_file, mode, folder_id):
+    """Recompute is_duplicate for every link from canonical URLs and save the flags that changed"""
+    try:
+        flags = duplicate_flags(df)
+        changed = df["is_duplicate"].astype(bool).to_numpy() != flags
+        if not changed.any():
+            return df, 0
+        updated_df = df.copy()
+        updated_df["is_duplicate"] = flags
+        if mode in ["admin", "guest"] and excel_file:
+            from utils.data_manager import make_update_op
+            from utils.save_queue import queue_changes
+            ops = [make_update_op(link_id, {"is_duplicate": bool(flag)})
+                   for link_id, flag in zip(df["link_id"][changed], flags[changed])]
+            if not queue_changes(updated_df, excel_file, folder_id, ops):
+                logging.error("Failed to save duplicate flags to Google Drive")
+                st.error("Failed to save data to Google Drive")
+                return df, 0
+        logging.debug(f"Re-dedupe changed {int(changed.sum())} duplicate flags")
+        return updated_df, int(changed.sum())
+    except Exception as e:
+        st.error(f"Error checking duplicates: {str(e)}")
+        logging.error(f"Re-dedupe failed: {str(e)}")
+        return df, 0
+
+TAG_CATEGORIES = ["News", "Shopping", "Research", "Entertainment", "Cloud", "Education", "Other"]
+LEMMA_BATCH_SIZE = 256
+
+def _lemmatize(texts):
+    """Lemmatize and drop stop words with spaCy in batches, or return the raw texts"""
+    nlp = init_nlp()
+    if not nlp:
+        return list(texts)
+    return [
+        " ".join(token.lemma_ for token in doc if not token.is_stop)
+        for doc in nlp.pipe(texts, batch_size=LEMMA_BATCH_SIZE)
+    ]
+
+def predict_tags(texts, urls, excel_file=None, folder_id=None):
+    """Predict one tag per (text, url) pair using the library's online tagger, classifier or rules, in batch"""
+    texts = ["" if text is None else str(text) for text in texts]
+    urls = ["" if url is None else str(url) for url in urls]
+    if not texts:
+        return []
+    
+    tags = [None] * len(texts)
+    if excel_file:
+        # Learned from this library's own tags once it has seen enough of them
+        try:
+            tags = get_online_tagger(excel_file, folder_id).predict(texts, urls)
+        except Exception as e:
+            logging.error(f"Online tagger prediction failed: {str(e)}")
+    pending = [i for i, tag in enumerate(tags) if tag is None]
+    if not pending:
+        return tags
     
     # Preprocess text with spaCy or fallback to raw text
-    nlp = init_nlp()
-    if nlp:
-        doc = nlp(text)
-        processed_text = " ".join([token.lemma_ for token in doc if not token.is_stop])
-    else:
-        processed_text = text
+    processed_texts = _lemmatize([texts[i] for i in pending])
     
+    predicted = [None] * len(pending)
     try:
-        # Use classifier
+        # Use classifier: one sparse matrix and one predict call for the whole batch
         vectorizer, classifier = train_classifier()
-        X = vectorizer.transform([processed_text])
-        tag = classifier.predict(X)[0]
-        if tag in categories:
-            return tag
+        predicted = classifier.predict(vectorizer.transform(processed_texts)).tolist()
     except Exception as e:
         logging.error(f"Classifier prediction failed: {str(e)}")
     
-    # Fallback: Rule-based tagging
-    text_lower = processed_text.lower()
-    url_lower = url.lower()
-    rules = {
-        "News": ["news", "article", "cnn", "bbc", "nytimes", "guardian"],
-        "Shopping": ["shop", "store", "buy", "amazon", "ebay", "walmart"],
-        "Research": ["research", "study", "paper", "arxiv", "scholar", "academic"],
-        "Entertainment": ["movie", "music", "youtube", "netflix", "spotify"],
-        "Cloud": ["cloud", "aws", "azure", "google cloud"],
-        "Education": ["education", "course", "coursera", "edx", "khan"],
-    }
+    # Fallback: Rule-based tagging for rows the classifier couldn't place
+    rule_engine = get_rule_engine()
+    for j, tag in enumerate(predicted):
+        if tag not in TAG_CATEGORIES:
+            predicted[j] = rule_engine.tag(processed_texts[j], urls[pending[j]])
+    for i, tag in zip(pending, predicted):
+        tags[i] = tag
+    return tags
+
+def predict_tag(text, url, excel_file=None, folder_id=None):
+    """Predict a single tag using classifier or rule-based fallback"""
+    return predict_tags([text], [url], excel_file, folder_id)[0]
+
+IMPORT_BATCH_SIZE = 500  # bookmarks fetched and tagged together
+
+def _process_bookmark_batch(links, excel_file=None, folder_id=None, progress_callback=None):
+    """Fetch missing metadata and tags for one batch of bookmarks and return them as library rows;
+    progress_callback(fetched, to_fetch) follows the metadata fetches"""
+    # Only links missing a title or description need their page fetched, unless pages are being archived
+    to_fetch = [link for link in links if ARCHIVE_PAGE_TEXT or not link["title"] or not link["description"]]
+    metadata_list = fetch_metadata_batch([link["url"] for link in to_fetch], progress_callback)
+    for link, metadata in zip(to_fetch, metadata_list):
+        if metadata.get("title") and not link["title"]:
+            link["title"] = metadata["title"]
+        if metadata.get("description") and not link["description"]:
+            link["description"] = metadata["description"]
+    
+    # Tags given in the file are kept and taught to the library's online tagger;
+    # the rest are predicted
+    tagged = [link for link in links if link["tags"]]
+    untagged = [link for link in links if not link["tags"]]
+    learn_tags(
+        excel_file, folder_id,
+        [f"{link['title']} {link['description']}" for link in tagged],
+        [link["url"] for link in tagged],
+        [link["tags"] for link in tagged]
+    )
+    tags = predict_tags(
+        [f"{link['title']} {link['description']}" for link in untagged],
+        [link["url"] for link in untagged],
+        excel_file, folder_id
+    )
+    for link, tag in zip(untagged, tags):
+        link["tags"] = tag
     
-    for tag, keywords in rules.items():
-        if any(keyword in text_lower or keyword in url_lower for keyword in keywords):
-            return tag
-    return "Other"
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return pd.DataFrame([
+        {
+            "link_id": link.get("link_id") or str(uuid.uuid4()),
+            "url": link["url"],
+            "title": link["title"],
+            "description": link["description"],
+            "tags": link["tags"],
+            "created_at": link.get("created_at") or now,
+            "updated_at": now,
+            "priority": link["priority"],
+            "number": link["number"],
+            "is_duplicate": link["is_duplicate"]
+        } for link in links
+    ])
+
+def import_bookmark_batches(links, url_index, duplicate_action, excel_file=None, folder_id=None, batch_size=IMPORT_BATCH_SIZE,
+                            progress_callback=None):
+    """Dedupe a stream of bookmarks against the library's URL index and yield new library rows, one fetched and tagged DataFrame per batch;
+    progress_callback(processed, read) reports links processed (skipped, or fetched and tagged) out of links read so far.
+    The index is only read: callers add the rows to it once they are committed"""
+    batch = []
+    seen = set()  # canonical URLs earlier in this file, not yet in the index
+    progress = {"read": 0, "processed": 0}
+
+    def report(processed):
+        if progress_callback:
+            progress_callback(processed, progress["read"])
+
+    def process(batch):
+        # Links of the batch count as processed as their pages are fetched
+        def fetched(completed, total):
+            report(progress["processed"] + len(batch) * completed // max(total, 1))
+        new_rows = _process_bookmark_batch(batch, excel_file, folder_id, fetched)
+        progress["processed"] += len(batch)
+        report(progress["processed"])
+        return new_rows
 
-def process_bookmark_file(df, uploaded_file, mode, duplicate_action, progress_bar):
+    for link in links:
+        progress["read"] += 1
+        key = canonical_url(link["url"])
+        link["is_duplicate"] = key in seen or url_index.contains_key(key)
+        if link["is_duplicate"] and duplicate_action == "Skip Duplicates":
+            progress["processed"] += 1
+            continue
+        seen.add(key)
+        link.setdefault("link_id", str(uuid.uuid4()))
+        batch.append(link)
+        if len(batch) >= batch_size:
+            yield process(batch)
+            batch = []
+    if batch:
+        yield process(batch)
+    report(progress["processed"])
+
+def process_bookmark_file(df, uploaded_file, mode, duplicate_action, progress_bar, excel_file=None, folder_id=None):
     """Process uploaded bookmark file (Excel, CSV, HTML) and categorize URLs"""
     try:
         with st.spinner("Processing bookmarks..."):
-            file_type = uploaded_file.name.split(".")[-1].lower()
-            links = []
-            
-            if file_type in ["xlsx", "csv"]:
-                if file_type == "xlsx":
-                    bookmark_df = pd.read_excel(uploaded_file, engine="openpyxl")
-                else:
-                    bookmark_df = pd.read_csv(uploaded_file)
-                
-                for idx, row in bookmark_df.iterrows():
-                    url = row.get("URL") or row.get("url") or ""
-                    if not url:
-                        continue
-                    title = row.get("Title") or row.get("title") or ""
-                    description = row.get("Description") or row.get("description") or ""
-                    number = row.get("Number") or row.get("number") or idx + 1
-                    links.append({
-                        "url": url,
-                        "title": title,
-                        "description": description,
-                        "priority": "Low",
-                        "number": number
-                    })
-            
-            elif file_type == "html":
-                soup = BeautifulSoup(uploaded_file, "html.parser")
-                for idx, a_tag in enumerate(soup.find_all("a"), 1):
-                    url = a_tag.get("href", "") or ""
-                    if not url:
-                        continue
-                    title = a_tag.text.strip() or ""
-                    links.append({
-                        "url": url,
-                        "title": title,
-                        "description": "",
-                        "priority": "Low",
-                        "number": idx
-                    })
-            
-            else:
-                raise ValueError("Unsupported file format. Use Excel, CSV, or HTML.")
+            # Rows stream from the file straight into fetch/tag batches, so the upload is never held as a whole
+            found = {"links": 0, "read_fraction": 0.0}
+            def links():
+                for link in iter_bookmarks(uploaded_file, progress_callback=lambda fraction: found.update(read_fraction=fraction)):
+                    found["links"] += 1
+                    yield link
+            def report(processed, read):
+                # Share of the file read, scaled by the share of read links already fetched and tagged
+                progress_bar.progress(min(found["read_fraction"] * processed / max(read, 1), 1.0),
+                                      text=f"{processed} of {read} links processed")
+            url_index = get_url_index(df, excel_file, folder_id)
+            batches = []
+            for new_rows in import_bookmark_batches(links(), url_index, duplicate_action, excel_file, folder_id,
+                                                    progress_callback=report):
+                batches.append(new_rows)
+                logging.debug(f"Imported batch of {len(new_rows)} bookmarks")
+            progress_bar.progress(1.0)
             
-            if not links:
+            if not found["links"]:
                 raise ValueError("No valid URLs found in the uploaded file.")
-            
-            existing_urls = set(df["url"].values) if not df.empty else set()
-            processed_links = []
-            total_links = len(links)
-            
-            for i, link in enumerate(links):
-                try:
-                    metadata = fetch_metadata(link["url"])
-                    if metadata.get("title") and not link["title"]:
-                        link["title"] = metadata["title"]
-                    if metadata.get("description") and not link["description"]:
-                        link["description"] = metadata["description"]
-                except Exception as e:
-                    logging.error(f"Metadata fetch failed for {link['url']}: {str(e)}")
-                    link["title"] = link.get("title", "")
-                    link["description"] = link.get("description", "")
-                
-                link["is_duplicate"] = link["url"] in existing_urls
-                if link["is_duplicate"] and duplicate_action == "Skip Duplicates":
-                    continue
-                text = f"{link['title']} {link['description']}"
-                link["tags"] = predict_tag(text, link["url"])
-                processed_links.append(link)
-                existing_urls.add(link["url"])
-                progress_bar.progress((i + 1) / total_links)
-            
-            if not processed_links:
+            if not batches:
                 raise ValueError("No new URLs to process after duplicate handling.")
             
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            new_rows = pd.DataFrame([
-                {
-                    "link_id": str(uuid.uuid4()),
-                    "url": link["url"],
-                    "title": link["title"],
-                    "description": link["description"],
-                    "tags": link["tags"],
-                    "created_at": now,
-                    "updated_at": now,
-                    "priority": link["priority"],
-                    "number": link["number"],
-                    "is_duplicate": link["is_duplicate"]
-                } for link in processed_links
-            ])
-            
+            new_rows = pd.concat(batches, ignore_index=True)
             if df.empty:
                 return new_rows
             return pd.concat([df, new_rows], ignore_index=True)
@@ -0,0 +1,118 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from utils.config import get_cache_dir, get_int_setting
+from utils.url_utils import normalize_url
+
+# Persistent page metadata cache, shared by every session of this process
+METADATA_CACHE_TTL = get_int_setting("METADATA_CACHE_TTL", 7 * 24 * 3600)  # seconds
+METADATA_CACHE_MAX_ENTRIES = get_int_setting("METADATA_CACHE_MAX_ENTRIES", 200000)
+EVICT_EVERY = 500  # writes between size checks
+
+_LOCK = threading.Lock()
+_CONN = None
+_WRITES = 0
+CACHE_STATS = {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0}
+
+def _connect():
+    """Open (once) the SQLite metadata store under the cache directory"""
+    global _CONN
+    if _CONN is None:
+        path = os.path.join(get_cache_dir(), "metadata.sqlite3")
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS metadata (
+                url_key TEXT PRIMARY KEY,
+                title TEXT,
+                description TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS metadata_accessed_at ON metadata(accessed_at)")
+        conn.commit()
+        logging.debug(f"Opened metadata cache at {path}")
+        _CONN = conn
+    return _CONN
+
+def get_cached_metadata(url):
+    """Return the cached entry for url with a 'fresh' flag, or None if it was never fetched"""
+    try:
+        with _LOCK:
+            conn = _connect()
+            row = conn.execute(
+                "SELECT title, description, etag, last_modified, fetched_at FROM metadata WHERE url_key = ?",
+                (normalize_url(url),)
+            ).fetchone()
+            if row is None:
+                CACHE_STATS["misses"] += 1
+                return None
+            now = time.time()
+            conn.execute("UPDATE metadata SET accessed_at = ? WHERE url_key = ?", (now, normalize_url(url)))
+            conn.commit()
+            fresh = now - (row[4] or 0) < METADATA_CACHE_TTL
+            CACHE_STATS["hits" if fresh else "stale"] += 1
+        return {
+            "title": row[0] or "",
+            "description": row[1] or "",
+            "etag": row[2],
+            "last_modified": row[3],
+            "fresh": fresh
+        }
+    except sqlite3.Error as e:
+        logging.error(f"Metadata cache read failed for {url}: {str(e)}")
+        return None
+
+def store_metadata(url, metadata, etag=None, last_modified=None):
+    """Store freshly fetched metadata together with its HTTP validators"""
+    global _WRITES
+    try:
+        with _LOCK:
+            conn = _connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), metadata.get("title", ""), metadata.get("description", ""),
+                 etag, last_modified, now, now)
+            )
+            conn.commit()
+            _WRITES += 1
+            if _WRITES % EVICT_EVERY == 0:
+                _evict(conn)
+    except sqlite3.Error as e:
+        logging.error(f"Metadata cache write failed for {url}: {str(e)}")
+
+def touch_metadata(url):
+    """Mark a cached entry as fresh again after a 304 Not Modified"""
+    try:
+        with _LOCK:
+            conn = _connect()
+            now = time.time()
+            conn.execute("UPDATE metadata SET fetched_at = ?, accessed_at = ? WHERE url_key = ?", (now, now, normalize_url(url)))
+            conn.commit()
+            CACHE_STATS["revalidated"] += 1
+    except sqlite3.Error as e:
+        logging.error(f"Metadata cache update failed for {url}: {str(e)}")
+
+def _evict(conn):
+    """Drop the least recently used entries beyond METADATA_CACHE_MAX_ENTRIES"""
+    count = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+    excess = count - METADATA_CACHE_MAX_ENTRIES
+    if excess > 0:
+        conn.execute(
+            "DELETE FROM metadata WHERE url_key IN (SELECT url_key FROM metadata ORDER BY accessed_at LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        logging.debug(f"Evicted {excess} entries from metadata cache")
+
+def get_metadata_cache_stats():
+    """Return hit/stale/miss/revalidation counters for the metadata cache"""
+    with _LOCK:
+        return dict(CACHE_STATS)
@@ -0,0 +1,51 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import joblib
+import sklearn
+from utils.config import get_cache_dir, get_setting
+
+def data_version(data):
+    """Hash training data together with the scikit-learn version that will fit it"""
+    payload = json.dumps(data, sort_keys=True, default=str) + sklearn.__version__
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _model_dir():
+    """Directory for model artifacts (MODEL_DIR, default <CACHE_DIR>/models)"""
+    model_dir = get_setting("MODEL_DIR") or get_cache_dir("models")
+    os.makedirs(model_dir, exist_ok=True)
+    return model_dir
+
+def _artifact_path(name, version):
+    return os.path.join(_model_dir(), f"{name}-{version}.joblib")
+
+def load_artifact(name, version):
+    """Load a persisted model artifact for this exact version, or None"""
+    path = _artifact_path(name, version)
+    if not os.path.exists(path):
+        return None
+    try:
+        artifact = joblib.load(path)
+        logging.debug(f"Loaded model artifact {path}")
+        return artifact
+    except Exception as e:
+        logging.error(f"Failed to load model artifact {path}: {str(e)}")
+        return None
+
+def save_artifact(name, version, artifact):
+    """Persist a model artifact atomically and remove older versions of it"""
+    path = _artifact_path(name, version)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(artifact, temp_path)
+        os.replace(temp_path, path)
+        for old_path in glob.glob(os.path.join(_model_dir(), f"{name}-*.joblib")):
+            if old_path != path:
+                os.remove(old_path)
+        logging.debug(f"Saved model artifact {path}")
+    except Exception as e:
+        logging.error(f"Failed to save model artifact {path}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
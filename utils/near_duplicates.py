@@ -0,0 +1,216 @@
+import re
+import zlib
+import numpy as np
+import pandas as pd
+
+# MinHash over word bigrams of title + description, bucketed with LSH so that a link is only
+# compared against the few links sharing a band with it instead of the whole library
+NUM_PERM = 64
+LSH_BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 estimated Jaccard nearly always share a band
+LSH_ROWS = NUM_PERM // LSH_BANDS
+NEAR_DUPLICATE_THRESHOLD = 0.6  # similarity at which a link is reported as a possible duplicate
+MIN_TOKENS = 3  # shorter texts ("Home", "Sign in") match far too often to be useful
+MAX_BUCKET_CANDIDATES = 50  # earlier links compared per bucket, so thousands of identical texts stay cheap
+SIGNATURE_CHUNK = 2000  # texts hashed together; bounds the temporary (bigrams x NUM_PERM) matrix
+
+_TOKEN_RE = re.compile(r"\w+")
+_RNG = np.random.RandomState(42)
+# Multiply-shift hashing: (a * x + b) >> 32 over 64-bit words, one (a, b) per permutation
+_PERM_A = _RNG.randint(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _RNG.randint(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+_BIGRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_BAND_MULTIPLIERS = _RNG.randint(1, 2 ** 62, size=LSH_ROWS, dtype=np.uint64) | np.uint64(1)
+
+def minhash_signatures(texts):
+    """MinHash signatures (one row per comparable text) and a mask of which texts were comparable"""
+    token_lists = [_TOKEN_RE.findall(str(text or "").lower()) for text in texts]
+    valid = np.array([len(tokens) >= MIN_TOKENS for tokens in token_lists], dtype=bool)
+    token_lists = [tokens for tokens in token_lists if len(tokens) >= MIN_TOKENS]
+    signatures = np.empty((len(token_lists), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(token_lists), SIGNATURE_CHUNK):
+        chunk = token_lists[start:start + SIGNATURE_CHUNK]
+        # Hash each distinct token once, then combine neighbours into bigram hashes
+        codes, vocabulary = pd.factorize(pd.Series([token for tokens in chunk for token in tokens], dtype=object))
+        token_hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in vocabulary), dtype=np.uint64, count=len(vocabulary))[codes]
+        lengths = np.array([len(tokens) for tokens in chunk])
+        ends = np.cumsum(lengths)
+        keep = np.ones(len(token_hashes) - 1, dtype=bool)
+        keep[ends[:-1] - 1] = False  # no bigram across two texts
+        bigrams = token_hashes[:-1][keep] * _BIGRAM_MULTIPLIER + token_hashes[1:][keep]
+        offsets = np.concatenate(([0], np.cumsum(lengths - 1)[:-1]))
+        # (NUM_PERM x bigrams) keeps each permutation contiguous for reduceat; updated in place
+        permuted = _PERM_A[:, None] * bigrams
+        permuted += _PERM_B[:, None]
+        permuted >>= np.uint64(32)
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures, valid
+
+def _band_keys(signatures):
+    """One 64-bit key per LSH band for each signature"""
+    bands = signatures.reshape(len(signatures), LSH_BANDS, LSH_ROWS).astype(np.uint64)
+    return (bands * _BAND_MULTIPLIERS).sum(axis=2)
+
+def _pairs_within(keys, rows):
+    """(later row, earlier row) pairs that share a band key among a batch of new rows"""
+    pairs = []
+    for band in range(LSH_BANDS):
+        order = np.argsort(keys[:, band], kind="stable")
+        sorted_keys = keys[order, band]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+        sizes = np.diff(np.append(starts, len(order)))
+        position = np.arange(len(order)) - np.repeat(starts, sizes)  # index of each row within its bucket
+        partners = np.minimum(position, MAX_BUCKET_CANDIDATES)
+        if not partners.any():
+            continue
+        members = np.repeat(np.arange(len(order)), partners)
+        first = np.repeat(np.cumsum(partners) - partners, partners)
+        earlier = np.repeat(np.repeat(starts, sizes), partners) + (np.arange(len(members)) - first)
+        pairs.append(np.column_stack((rows[order[members]], rows[order[earlier]])))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+class NearDuplicateIndex:
+    """LSH index of MinHash signatures that tracks each link's most similar other link"""
+
+    def __init__(self):
+        self.rows = {}  # link_id -> row in signatures
+        self.ids = []  # row -> link_id, None once deleted (deleted rows are skipped, not unbucketed)
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        # Buckets: per band, keys sorted once for the bulk of the library plus a dict of recent adds
+        self.sorted_keys = np.empty((LSH_BANDS, 0), dtype=np.uint64)
+        self.sorted_rows = np.empty((LSH_BANDS, 0), dtype=np.int64)
+        self.recent = [{} for _ in range(LSH_BANDS)]  # band -> {band key: [row, ...]}
+        self.recent_count = 0
+        self.best = {}  # link_id -> (most similar link_id, similarity)
+        self.best_of = {}  # link_id -> link ids whose best match it is
+
+    def _append(self, signatures):
+        """Store signatures, growing the array geometrically so single adds stay cheap"""
+        start = len(self.ids)
+        needed = start + len(signatures)
+        if needed > len(self.signatures):
+            grown = np.empty((max(needed, 2 * len(self.signatures), 1024), NUM_PERM), dtype=np.uint32)
+            grown[:start] = self.signatures[:start]
+            self.signatures = grown
+        self.signatures[start:needed] = signatures
+        return start
+
+    def _rebuild_buckets(self):
+        """Sort every live row's band keys into the bulk buckets and empty the recent ones"""
+        live = np.array([row for row, link_id in enumerate(self.ids) if link_id is not None], dtype=np.int64)
+        keys = _band_keys(self.signatures[live]).T if len(live) else np.empty((LSH_BANDS, 0), dtype=np.uint64)
+        order = np.argsort(keys, axis=1, kind="stable")
+        self.sorted_keys = np.take_along_axis(keys, order, axis=1)
+        self.sorted_rows = live[order] if len(live) else np.empty((LSH_BANDS, 0), dtype=np.int64)
+        self.recent = [{} for _ in range(LSH_BANDS)]
+        self.recent_count = 0
+
+    def _insert(self, keys, rows):
+        """Bucket new rows; once recent adds are a sizeable share of the index, re-sort everything"""
+        self.recent_count += len(rows)
+        if self.recent_count > max(1000, self.sorted_keys.shape[1] // 10):
+            self._rebuild_buckets()
+            return
+        for band in range(LSH_BANDS):
+            buckets = self.recent[band]
+            for key, row in zip(keys[:, band].tolist(), rows):
+                buckets.setdefault(key, []).append(row)
+
+    def _set_best(self, link_id, other, similarity):
+        previous = self.best.get(link_id)
+        if previous:
+            self.best_of.get(previous[0], set()).discard(link_id)
+        self.best[link_id] = (other, similarity)
+        self.best_of.setdefault(other, set()).add(link_id)
+
+    def _offer(self, pairs):
+        """Record each pair above the threshold as a best match where it beats the current one"""
+        if not len(pairs):
+            return
+        pairs = np.unique(pairs, axis=0)
+        similarities = (self.signatures[pairs[:, 0]] == self.signatures[pairs[:, 1]]).mean(axis=1)
+        close = similarities >= NEAR_DUPLICATE_THRESHOLD
+        # Highest similarity first, then earliest rows, so ties go to the earliest indexed link
+        for later, earlier, similarity in sorted(zip(pairs[close, 0].tolist(), pairs[close, 1].tolist(), similarities[close].tolist()),
+                                                 key=lambda pair: (-pair[2], pair[1], pair[0])):
+            for row, other in ((later, earlier), (earlier, later)):
+                link_id = self.ids[row]
+                if similarity > self.best.get(link_id, (None, 0.0))[1]:
+                    self._set_best(link_id, self.ids[other], similarity)
+
+    def _candidates(self, keys, rows):
+        """(row, indexed row) pairs sharing a bucket, skipping deleted rows"""
+        pairs = []
+        for band in range(LSH_BANDS):
+            band_keys = keys[:, band]
+            low = np.searchsorted(self.sorted_keys[band], band_keys, side="left")
+            high = np.minimum(np.searchsorted(self.sorted_keys[band], band_keys, side="right"), low + MAX_BUCKET_CANDIDATES)
+            recent = self.recent[band]
+            for i in np.flatnonzero(high > low).tolist():
+                pairs.extend((rows[i], other) for other in self.sorted_rows[band, low[i]:high[i]].tolist())
+            if recent:
+                for row, key in zip(rows, band_keys.tolist()):
+                    pairs.extend((row, other) for other in recent.get(key, ())[:MAX_BUCKET_CANDIDATES])
+        pairs = [(row, other) for row, other in pairs if row != other and self.ids[other] is not None]
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+    def add(self, link_ids, texts):
+        """Fingerprint and index new links, matching them against each other and the indexed links"""
+        signatures, valid = minhash_signatures(texts)
+        link_ids = [link_id for link_id, ok in zip(link_ids, valid) if ok]
+        seen = set()
+        new = []
+        for i, link_id in enumerate(link_ids):
+            if link_id not in self.rows and link_id not in seen:
+                seen.add(link_id)
+                new.append(i)
+        if not new:
+            return
+        signatures = signatures[new]
+        keys = _band_keys(signatures)
+        start = self._append(signatures)
+        rows = np.arange(start, start + len(new))
+        for row, i in zip(rows.tolist(), new):
+            self.rows[link_ids[i]] = row
+            self.ids.append(link_ids[i])
+        existing = self._candidates(keys, rows.tolist())
+        self._insert(keys, rows.tolist())
+        self._offer(np.concatenate((existing, _pairs_within(keys, rows))))
+
+    def remove(self, link_ids):
+        """Drop deleted links and re-match the links whose best match they were"""
+        orphans = set()
+        for link_id in link_ids:
+            row = self.rows.pop(link_id, None)
+            if row is None:
+                continue
+            self.ids[row] = None
+            previous = self.best.pop(link_id, None)
+            if previous:
+                self.best_of.get(previous[0], set()).discard(link_id)
+            orphans.update(self.best_of.pop(link_id, set()))
+        orphan_rows = [self.rows[link_id] for link_id in orphans if link_id in self.rows]
+        for row in orphan_rows:
+            self.best.pop(self.ids[row], None)
+        if orphan_rows:
+            self._offer(self._candidates(_band_keys(self.signatures[orphan_rows]), orphan_rows))
+
+    def match(self, link_id):
+        """(most similar link_id, similarity) for an indexed link, or None"""
+        return self.best.get(link_id)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getstate__(self):
+        # Only live signatures are saved; buckets are re-sorted on load
+        live = [row for row, link_id in enumerate(self.ids) if link_id is not None]
+        return {"ids": [self.ids[row] for row in live], "signatures": self.signatures[live], "best": self.best}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.ids = list(state["ids"])
+        self.rows = {link_id: row for row, link_id in enumerate(self.ids)}
+        self.signatures = state["signatures"]
+        self._rebuild_buckets()
+        for link_id, (other, similarity) in state["best"].items():
+            self._set_best(link_id, other, similarity)
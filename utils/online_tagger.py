@@ -0,0 +1,231 @@
+import atexit
+import io
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from utils.config import get_int_setting
+from utils.data_manager import read_drive_bytes, write_drive_bytes
+
+# Constant-memory features: no vocabulary to grow as the library grows
+ONLINE_N_FEATURES = 2 ** 16
+ONLINE_MIN_SAMPLES = get_int_setting("ONLINE_TAGGER_MIN_SAMPLES", 50)  # learned rows before predictions are used
+ONLINE_MIN_CONFIDENCE = 0.6  # probability the best tag must reach to be used
+ONLINE_MAX_TAGS = get_int_setting("ONLINE_TAGGER_MAX_TAGS", 200)  # only the most used tags get a model
+ONLINE_NEGATIVE_TAGS = get_int_setting("ONLINE_TAGGER_NEGATIVE_TAGS", 20)  # models of absent tags also fit per batch
+LEARN_BATCH_SIZE = 64
+LEARN_FLUSH_SECONDS = 5
+LEARN_QUEUE_SIZE = get_int_setting("ONLINE_TAGGER_QUEUE_SIZE", 10000)  # rows waiting to be learned; more are dropped
+PERSIST_SAMPLES = get_int_setting("ONLINE_TAGGER_PERSIST_SAMPLES", 1000)  # learned rows that trigger an upload
+PERSIST_SECONDS = get_int_setting("ONLINE_TAGGER_PERSIST_SECONDS", 300)  # oldest unsaved row waits at most this long
+
+_VECTORIZER = HashingVectorizer(
+    n_features=ONLINE_N_FEATURES,
+    alternate_sign=False,
+    ngram_range=(1, 2),
+    stop_words="english"
+)
+
+def _host_words(url):
+    """Host labels as words, minus www and the TLD: https://www.bbc.co.uk/x -> 'bbc co'"""
+    labels = url.split("//")[-1].split("/")[0].split(":")[0].lower().split(".")
+    return " ".join(label for label in labels[:-1] if label != "www")
+
+def _features(texts, urls):
+    """Hash text plus URL host words into a sparse feature matrix"""
+    return _VECTORIZER.transform([f"{text} {_host_words(url)}" for text, url in zip(texts, urls)])
+
+def split_tags(tags):
+    """Split a comma-separated tags value into clean tag names"""
+    if not isinstance(tags, str):
+        tags = ",".join(str(tag) for tag in tags) if isinstance(tags, (list, tuple, set)) else ""
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+class OnlineTagger:
+    """Incrementally trained tagger: one partial_fit binary model per tag over hashed features,
+    for the ONLINE_MAX_TAGS most used tags"""
+
+    def __init__(self):
+        self.models = {}
+        self.tag_counts = {}  # tag -> learned rows carrying it, for every tag seen
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def _model_for(self, tag):
+        """The tag's model, created if the tag is among the most used ones (evicting the least used model if needed)"""
+        if tag in self.models:
+            return self.models[tag]
+        if len(self.models) >= ONLINE_MAX_TAGS:
+            weakest = min(self.models, key=self.tag_counts.get)
+            if self.tag_counts[weakest] >= self.tag_counts[tag]:
+                return None
+            del self.models[weakest]
+        # No intercept: rows sharing no features with a tag score 0.5, i.e. "unsure"
+        self.models[tag] = SGDClassifier(loss="log_loss", alpha=1e-5, fit_intercept=False, random_state=42)
+        return self.models[tag]
+
+    def partial_fit(self, texts, urls, tag_lists):
+        """Update the models of the tags in one batch (creating models for new tags), plus a random sample
+        of ONLINE_NEGATIVE_TAGS other models: rows without a model's tag are its negatives, so a batch
+        of one tag still teaches the others what they are not"""
+        X = _features(texts, urls)
+        present = {tag for tags in tag_lists for tag in tags}
+        with self.lock:
+            for tags in tag_lists:
+                for tag in set(tags):
+                    self.tag_counts[tag] = self.tag_counts.get(tag, 0) + 1
+            for tag in present:
+                self._model_for(tag)
+            updated = [tag for tag in present if tag in self.models]
+            absent = [tag for tag in self.models if tag not in present]
+            updated += random.sample(absent, min(ONLINE_NEGATIVE_TAGS, len(absent)))
+            for tag in updated:
+                model = self.models[tag]
+                y = np.array([1 if tag in tags else 0 for tags in tag_lists])
+                model.partial_fit(X, y, classes=np.array([0, 1]))
+            self.samples += len(texts)
+
+    def predict(self, texts, urls):
+        """Return the best tag per row, or None where the tagger is untrained or not confident"""
+        with self.lock:
+            if self.samples < ONLINE_MIN_SAMPLES or not self.models:
+                return [None] * len(texts)
+            tags = list(self.models)
+            X = _features(texts, urls)
+            scores = np.column_stack([self.models[tag].predict_proba(X)[:, 1] for tag in tags])
+        best = scores.argmax(axis=1)
+        return [tags[i] if scores[row, i] >= ONLINE_MIN_CONFIDENCE else None for row, i in enumerate(best)]
+
+    def __getstate__(self):
+        return {"models": self.models, "tag_counts": self.tag_counts, "samples": self.samples}
+
+    def __setstate__(self, state):
+        self.models = state["models"]
+        self.tag_counts = state.get("tag_counts") or {tag: 0 for tag in self.models}
+        self.samples = state["samples"]
+        self.lock = threading.Lock()
+
+# Taggers live next to their library in Drive: links.xlsx -> links_tagger.joblib
+_TAGGERS = {}
+_TAGGERS_LOCK = threading.Lock()
+_LEARN_QUEUE = queue.Queue(maxsize=LEARN_QUEUE_SIZE)
+_UNSAVED = {}  # (folder_id, excel_file) -> [rows learned since the last upload, monotonic time of the first]
+_WORKER = None
+
+def _state_file(excel_file):
+    return f"{os.path.splitext(excel_file)[0]}_tagger.joblib"
+
+def get_online_tagger(excel_file, folder_id):
+    """Return the library's tagger, loading its persisted state from Drive on first use"""
+    key = (folder_id, excel_file)
+    with _TAGGERS_LOCK:
+        if key in _TAGGERS:
+            return _TAGGERS[key]
+    tagger = None
+    data = read_drive_bytes(_state_file(excel_file), folder_id)
+    if data:
+        try:
+            tagger = joblib.load(io.BytesIO(data))
+            logging.debug(f"Loaded online tagger for {excel_file}: {tagger.samples} samples, {len(tagger.models)} tags")
+        except Exception as e:
+            logging.error(f"Failed to load online tagger for {excel_file}: {str(e)}")
+    with _TAGGERS_LOCK:
+        return _TAGGERS.setdefault(key, tagger or OnlineTagger())
+
+def _persist(excel_file, folder_id, tagger):
+    """Upload the tagger state next to the library"""
+    buffer = io.BytesIO()
+    with tagger.lock:
+        joblib.dump(tagger, buffer, compress=3)
+    if write_drive_bytes(_state_file(excel_file), folder_id, buffer.getvalue()):
+        logging.debug(f"Persisted online tagger for {excel_file}: {tagger.samples} samples")
+
+def _persist_due(force=False):
+    """Upload taggers whose unsaved rows reached PERSIST_SAMPLES or waited PERSIST_SECONDS (all of them if force)"""
+    now = time.monotonic()
+    with _TAGGERS_LOCK:
+        due = [key for key, (rows, since) in _UNSAVED.items()
+               if force or rows >= PERSIST_SAMPLES or now - since >= PERSIST_SECONDS]
+        for key in due:
+            del _UNSAVED[key]
+        due = [(key, _TAGGERS[key]) for key in due if key in _TAGGERS]
+    for (folder_id, excel_file), tagger in due:
+        try:
+            _persist(excel_file, folder_id, tagger)
+        except Exception as e:
+            logging.error(f"Failed to persist online tagger for {excel_file}: {str(e)}")
+
+def _next_persist_wait():
+    """Seconds until the oldest unsaved tagger is due for upload, or None if all are saved"""
+    with _TAGGERS_LOCK:
+        if not _UNSAVED:
+            return None
+        return max(0, min(since for _, since in _UNSAVED.values()) + PERSIST_SECONDS - time.monotonic())
+
+def _learn_worker():
+    """Drain the learning queue in small batches, off the request path"""
+    while True:
+        try:
+            batch = [_LEARN_QUEUE.get(timeout=_next_persist_wait())]
+        except queue.Empty:
+            _persist_due()
+            continue
+        deadline = time.monotonic() + LEARN_FLUSH_SECONDS
+        while len(batch) < LEARN_BATCH_SIZE:
+            try:
+                batch.append(_LEARN_QUEUE.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        by_library = {}
+        for excel_file, folder_id, text, url, tags in batch:
+            by_library.setdefault((excel_file, folder_id), []).append((text, url, tags))
+        for (excel_file, folder_id), rows in by_library.items():
+            try:
+                tagger = get_online_tagger(excel_file, folder_id)
+                texts, urls, tag_lists = zip(*rows)
+                tagger.partial_fit(list(texts), list(urls), list(tag_lists))
+                with _TAGGERS_LOCK:
+                    unsaved = _UNSAVED.setdefault((folder_id, excel_file), [0, time.monotonic()])
+                    unsaved[0] += len(rows)
+            except Exception as e:
+                logging.error(f"Online tagger update failed for {excel_file}: {str(e)}")
+        _persist_due()
+        for _ in batch:
+            _LEARN_QUEUE.task_done()
+
+def learn_tags(excel_file, folder_id, texts, urls, tags):
+    """Queue user-assigned tags for background learning; rows without tags are ignored"""
+    global _WORKER
+    if not excel_file:
+        return
+    queued = dropped = 0
+    for text, url, row_tags in zip(texts, urls, tags):
+        tag_list = split_tags(row_tags)
+        if not tag_list:
+            continue
+        try:
+            # Never block the caller: a backlog this large means learning cannot keep up, and a few
+            # unlearned rows only cost the tagger some accuracy
+            _LEARN_QUEUE.put_nowait((excel_file, folder_id, str(text or ""), str(url or ""), tag_list))
+            queued += 1
+        except queue.Full:
+            dropped += 1
+    if dropped:
+        logging.warning(f"Online tagger queue full, dropped {dropped} rows for {excel_file}")
+    with _TAGGERS_LOCK:
+        if queued and (_WORKER is None or not _WORKER.is_alive()):
+            _WORKER = threading.Thread(target=_learn_worker, name="online-tagger", daemon=True)
+            _WORKER.start()
+    logging.debug(f"Queued {queued} rows for online tag learning on {excel_file}")
+
+def persist_online_taggers():
+    """Upload every tagger with rows learned since its last upload; used at shutdown"""
+    _persist_due(force=True)
+
+atexit.register(persist_online_taggers)
@@ -0,0 +1,158 @@
+import atexit
+import logging
+import threading
+import time
+import streamlit as st
+from datetime import datetime
+from utils.config import get_int_setting
+from utils.data_manager import drive_available, record_changes, read_library, write_changes, add_pending_ops, clear_pending_ops
+
+# Write-behind saving: edits return immediately and a background worker uploads them
+SAVE_COALESCE_SECONDS = get_int_setting("SAVE_COALESCE_SECONDS", 2)  # quiet time before a burst is written
+SAVE_MAX_DELAY = 30  # seconds a busy target may wait before it is written anyway
+SAVE_RETRY_BASE = 2  # seconds, doubled on each failed attempt
+SAVE_RETRY_MAX = 300
+
+_LOCK = threading.Condition()
+_TARGETS = {}  # (folder_id, excel_file) -> pending state for one library file
+_WORKER = None
+
+def _new_target():
+    return {
+        "ops": [],
+        "first_queued": None,
+        "last_queued": None,
+        "next_attempt": 0,
+        "attempts": 0,
+        "flushing": False,
+        "progress": None,
+        "last_flushed": None,
+        "last_error": None
+    }
+
+def _due_at(target):
+    """Monotonic time at which a target's pending edits should be written"""
+    due = min(target["last_queued"] + SAVE_COALESCE_SECONDS, target["first_queued"] + SAVE_MAX_DELAY)
+    return max(due, target["next_attempt"])
+
+def _flush(key, target):
+    """Write one target's pending edits as a single journal append; call with _LOCK held"""
+    folder_id, excel_file = key
+    if not target["ops"] or target["flushing"]:
+        return
+    ops = target["ops"]
+    target["ops"] = []
+    target["first_queued"] = target["last_queued"] = None
+    target["flushing"] = True
+    target["progress"] = None
+    _LOCK.release()
+    def report(fraction):
+        with _LOCK:
+            target["progress"] = fraction
+    try:
+        # The frame comes from the library plus every pending op, not from whichever
+        # session queued last, so edits from other sessions and import jobs are never dropped
+        df = read_library(excel_file, folder_id)
+        write_changes(df, excel_file, folder_id, ops, report)
+        error = None
+    except Exception as e:
+        error = e
+    finally:
+        _LOCK.acquire()
+        target["flushing"] = False
+
+    if error is None:
+        clear_pending_ops(excel_file, folder_id, ops)
+        target["attempts"] = 0
+        target["next_attempt"] = 0
+        target["last_flushed"] = datetime.now()
+        target["last_error"] = None
+        logging.debug(f"Flushed {len(ops)} queued ops to {excel_file}")
+        return
+
+    # Put the ops back in front of anything queued meanwhile and retry later
+    target["ops"] = ops + target["ops"]
+    now = time.monotonic()
+    target["first_queued"] = target["first_queued"] or now
+    target["last_queued"] = target["last_queued"] or now
+    target["attempts"] += 1
+    target["next_attempt"] = now + min(SAVE_RETRY_BASE * 2 ** (target["attempts"] - 1), SAVE_RETRY_MAX)
+    target["last_error"] = str(error)
+    logging.error(f"Queued save of {excel_file} failed (attempt {target['attempts']}): {str(error)}")
+
+def _save_worker():
+    """Write each target once its burst of edits has gone quiet"""
+    with _LOCK:
+        while True:
+            now = time.monotonic()
+            due = [(key, target) for key, target in _TARGETS.items()
+                   if target["ops"] and not target["flushing"] and _due_at(target) <= now]
+            if due:
+                for key, target in due:
+                    _flush(key, target)
+                continue
+            waits = [_due_at(target) - now for target in _TARGETS.values() if target["ops"] and not target["flushing"]]
+            _LOCK.wait(timeout=min(waits) if waits else None)
+
+def queue_ops(excel_file, folder_id, ops):
+    """Queue ops for background saving without touching session state (safe from any thread)"""
+    global _WORKER
+    with _LOCK:
+        # Overlay and target take the ops together, so loads replay them in the order Drive gets them
+        add_pending_ops(excel_file, folder_id, ops)
+        target = _TARGETS.setdefault((folder_id, excel_file), _new_target())
+        now = time.monotonic()
+        target["ops"].extend(ops)
+        target["first_queued"] = target["first_queued"] or now
+        target["last_queued"] = now
+        if _WORKER is None or not _WORKER.is_alive():
+            _WORKER = threading.Thread(target=_save_worker, name="save-queue", daemon=True)
+            _WORKER.start()
+        _LOCK.notify_all()
+    logging.debug(f"Queued {len(ops)} ops for {excel_file} ({len(target['ops'])} pending)")
+
+def queue_changes(df, excel_file, folder_id, ops):
+    """Accept edits for background saving; falls back to a synchronous save without Drive"""
+    if not drive_available() or not folder_id:
+        return record_changes(df, excel_file, folder_id, ops)
+    st.session_state["local_df"] = df  # Always save to session state
+    queue_ops(excel_file, folder_id, ops)
+    return True
+
+def get_save_status(excel_file, folder_id):
+    """Return pending/flushing/last flushed/last error state for one library file"""
+    with _LOCK:
+        target = _TARGETS.get((folder_id, excel_file))
+        if target is None:
+            return {"pending": 0, "flushing": False, "progress": None, "last_flushed": None, "last_error": None, "attempts": 0}
+        return {
+            "pending": len(target["ops"]),
+            "flushing": target["flushing"],
+            "progress": target["progress"] if target["flushing"] else None,
+            "last_flushed": target["last_flushed"],
+            "last_error": target["last_error"],
+            "attempts": target["attempts"]
+        }
+
+def flush_all(timeout=60):
+    """Write every pending target now, waiting for in-flight writes; used at shutdown"""
+    deadline = time.monotonic() + timeout
+    tried = set()
+    with _LOCK:
+        while time.monotonic() < deadline:
+            pending = [(key, target) for key, target in _TARGETS.items()
+                       if target["ops"] and not target["flushing"] and key not in tried]
+            if pending:
+                # One attempt per target: do not spin on a failing Drive during shutdown
+                key, target = pending[0]
+                tried.add(key)
+                _flush(key, target)
+                continue
+            if not any(target["flushing"] for target in _TARGETS.values()):
+                break
+            _LOCK.wait(timeout=0.1)
+        left = sum(len(target["ops"]) for target in _TARGETS.values())
+    if left:
+        logging.error(f"Shutting down with {left} unsaved queued ops")
+
+atexit.register(flush_all)
@@ -0,0 +1,285 @@
+import bisect
+import re
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Inverted index for Browse search: normalized token -> sorted row numbers, with prefix
+# queries answered from a sorted vocabulary instead of scanning every row's text
+_TOKEN_RE = re.compile(r"\w+")
+RANKED_RESULTS = 200  # links shown in ranked mode, best first
+
+def tokenize(text):
+    """Lowercased word tokens of a text; URLs split on punctuation into host and path words"""
+    return _TOKEN_RE.findall(str(text).casefold()) if isinstance(text, str) else []
+
+def search_texts(rows):
+    """Searchable text of each row: title, description, URL and tags"""
+    columns = [rows[column].tolist() if column in rows.columns else [""] * len(rows)
+               for column in ["title", "description", "url", "tags"]]
+    return [" ".join(value for value in values if isinstance(value, str)) for values in zip(*columns)]
+
+def ranking_texts(rows):
+    """Text ranked search weighs: title, description and tags"""
+    columns = [rows[column].tolist() if column in rows.columns else [""] * len(rows)
+               for column in ["title", "description", "tags"]]
+    return [" ".join(value for value in values if isinstance(value, str)) for values in zip(*columns)]
+
+def parse_query(query):
+    """Split a query into OR groups of AND terms; each term is (token, is_prefix)
+
+    'deep learning OR pytorch*' -> [[("deep", False), ("learning", False)], [("pytorch", True)]]
+    """
+    groups = [[]]
+    for word in str(query or "").split():
+        if word in ["OR", "|"]:
+            groups.append([])
+            continue
+        if word == "AND":
+            continue
+        tokens = tokenize(word)
+        for i, token in enumerate(tokens):
+            groups[-1].append((token, word.endswith("*") and i == len(tokens) - 1))
+    return [group for group in groups if group]
+
+class TokenIndex:
+    """Token -> row postings, kept as sorted arrays for the bulk of the library plus lists of recent adds"""
+
+    def __init__(self):
+        self.rows = {}  # link_id -> row
+        self.ids = []  # row -> link_id
+        self.alive = np.zeros(0, dtype=bool)  # deleted rows stay in postings and are filtered out
+        self.postings = {}  # token -> sorted np.int32 array of rows
+        self.recent = {}  # token -> [row, ...] added since the last merge
+        self.recent_count = 0
+        self.vocabulary = []  # every token, sorted, for prefix ranges
+
+    def _grow(self, count):
+        if len(self.ids) + count > len(self.alive):
+            alive = np.zeros(max(len(self.ids) + count, 2 * len(self.alive), 1024), dtype=bool)
+            alive[:len(self.ids)] = self.alive[:len(self.ids)]
+            self.alive = alive
+
+    def _merge(self):
+        """Fold recent postings into the sorted arrays"""
+        for token, rows in self.recent.items():
+            recent = np.array(rows, dtype=np.int32)
+            bulk = self.postings.get(token)
+            self.postings[token] = recent if bulk is None else np.concatenate((bulk, recent))
+        self.recent = {}
+        self.recent_count = 0
+
+    def add(self, link_ids, texts):
+        """Index new links; rows are numbered in insertion order, so postings stay sorted"""
+        link_ids = list(link_ids)
+        self._grow(len(link_ids))
+        new_tokens = set()
+        for link_id, text in zip(link_ids, texts):
+            if link_id in self.rows:
+                continue
+            row = len(self.ids)
+            self.rows[link_id] = row
+            self.ids.append(link_id)
+            self.alive[row] = True
+            for token in set(tokenize(text)):
+                postings = self.recent.get(token)
+                if postings is None:
+                    self.recent[token] = [row]
+                    if token not in self.postings:
+                        new_tokens.add(token)
+                else:
+                    postings.append(row)
+            self.recent_count += 1
+        if len(new_tokens) > 64:
+            self.vocabulary = sorted(set(self.vocabulary).union(new_tokens))
+        else:
+            for token in new_tokens:
+                position = bisect.bisect_left(self.vocabulary, token)
+                if position == len(self.vocabulary) or self.vocabulary[position] != token:
+                    self.vocabulary.insert(position, token)
+        if self.recent_count > max(1000, len(self.ids) // 10):
+            self._merge()
+
+    def remove(self, link_ids):
+        """Forget deleted links"""
+        for link_id in link_ids:
+            row = self.rows.pop(link_id, None)
+            if row is not None:
+                self.alive[row] = False
+
+    def _token_rows(self, token):
+        bulk = self.postings.get(token)
+        recent = self.recent.get(token)
+        if recent is None:
+            return bulk if bulk is not None else np.zeros(0, dtype=np.int32)
+        recent = np.array(recent, dtype=np.int32)
+        return recent if bulk is None else np.concatenate((bulk, recent))
+
+    def _term_rows(self, token, prefix):
+        if not prefix:
+            return self._token_rows(token)
+        start = bisect.bisect_left(self.vocabulary, token)
+        end = bisect.bisect_left(self.vocabulary, token + "\U0010ffff", lo=start)
+        if end - start == 1:
+            return self._token_rows(self.vocabulary[start])
+        return self._union([self._token_rows(t) for t in self.vocabulary[start:end]])
+
+    def _union(self, arrays):
+        """Sorted rows in any of the arrays; a row mask is linear, where sorting the concatenation is not"""
+        if not arrays:
+            return np.zeros(0, dtype=np.int32)
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for rows in arrays:
+            mask[rows] = True
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def search(self, query):
+        """link_ids matching the query (terms ANDed, groups ORed, 'term*' for prefixes), or None for an empty query"""
+        groups = parse_query(query)
+        if not groups:
+            return None
+        matched = []
+        for group in groups:
+            # Intersect the rarest terms first so the working set shrinks fastest
+            term_rows = sorted((self._term_rows(token, prefix) for token, prefix in group), key=len)
+            rows = term_rows[0]
+            for other in term_rows[1:]:
+                if not len(rows):
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            matched.append(rows)
+        rows = matched[0] if len(matched) == 1 else self._union(matched)
+        rows = rows[self.alive[rows]]
+        return [self.ids[row] for row in rows.tolist()]
+
+    def memory_bytes(self):
+        """Approximate size of the postings arrays, excluding Python object overhead"""
+        return sum(array.nbytes for array in self.postings.values()) + 8 * sum(len(rows) for rows in self.recent.values())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getstate__(self):
+        self._merge()
+        return {"ids": self.ids, "rows": self.rows, "alive": self.alive[:len(self.ids)],
+                "postings": self.postings, "vocabulary": self.vocabulary}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.ids = state["ids"]
+        self.rows = state["rows"]
+        self.alive = state["alive"]
+        self.postings = state["postings"]
+        self.vocabulary = state["vocabulary"]
+
+class TfidfIndex:
+    """L2-normalized TF-IDF rows of the library, scored against a query with one sparse product
+
+    The bulk matrix is stored by column, so a query reads only the columns of its own terms.
+
+    Links added after the fit are transformed with the fitted vocabulary and IDF and kept in small
+    pending blocks; the whole library is refit only once those adds are a large share of it.
+    """
+
+    REFIT_SHARE = 4  # refit once links added since the fit reach 1/REFIT_SHARE of the fitted ones
+
+    def __init__(self):
+        self.vectorizer = None
+        self.rows = {}  # link_id -> row
+        self.ids = []  # row -> link_id
+        self.alive = np.zeros(0, dtype=bool)
+        self.matrix = sp.csc_matrix((0, 0), dtype=np.float32)
+        self.pending = []  # CSR blocks of rows added since the last merge
+        self.pending_count = 0
+        self.fitted = None  # number of links at the last fit, None before the first one
+
+    def needs_fit(self):
+        return self.fitted is None or (len(self.ids) - self.fitted) * self.REFIT_SHARE > max(self.fitted, 1)
+
+    def fit(self, link_ids, texts):
+        """Learn the vocabulary and IDF from the whole library and rebuild the matrix"""
+        self.__init__()
+        link_ids = list(link_ids)
+        self.vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True, dtype=np.float32)
+        try:
+            self.matrix = self.vectorizer.fit_transform(texts).tocsc()
+            self.vectorizer.stop_words_ = None  # only needed while fitting, and large to pickle
+        except ValueError:
+            # Empty library, or nothing but stop words: keep the links so the next add can trigger a refit
+            self.vectorizer = None
+            self.matrix = sp.csc_matrix((len(link_ids), 0), dtype=np.float32)
+        self.ids = link_ids
+        self.rows = {link_id: row for row, link_id in enumerate(link_ids)}
+        self.alive = np.ones(len(link_ids), dtype=bool)
+        self.fitted = len(link_ids)
+
+    def add(self, link_ids, texts):
+        """Append new links transformed with the fitted vocabulary; words it lacks count once refit"""
+        if self.fitted is None:
+            return  # not built yet; the first ranked search fits the whole library
+        new = [(link_id, text) for link_id, text in zip(link_ids, texts) if link_id not in self.rows]
+        if not new:
+            return
+        for link_id, _ in new:
+            self.rows[link_id] = len(self.ids)
+            self.ids.append(link_id)
+        self.alive = np.concatenate((self.alive, np.ones(len(new), dtype=bool)))
+        if self.vectorizer is not None:
+            self.pending.append(self.vectorizer.transform([text for _, text in new]).tocsr())
+        else:
+            self.pending.append(sp.csr_matrix((len(new), self.matrix.shape[1]), dtype=np.float32))
+        self.pending_count += len(new)
+        if self.pending_count > max(1000, self.matrix.shape[0] // 10):
+            self._merge()
+
+    def _merge(self):
+        if self.pending:
+            self.matrix = sp.vstack([self.matrix] + self.pending, format="csc")
+            self.pending = []
+            self.pending_count = 0
+
+    def remove(self, link_ids):
+        """Forget deleted links"""
+        for link_id in link_ids:
+            row = self.rows.pop(link_id, None)
+            if row is not None:
+                self.alive[row] = False
+
+    def top(self, query, k, link_ids=None):
+        """Up to k (link_id, score) pairs with the highest cosine similarity to the query, best first;
+        link_ids restricts the ranking to those links"""
+        if self.vectorizer is None or k <= 0:
+            return []
+        words = [token for group in parse_query(query) for token, _ in group]
+        query_vector = self.vectorizer.transform([" ".join(words)])
+        if not query_vector.nnz:
+            return []
+        if len(self.pending) > 1:
+            self.pending = [sp.vstack(self.pending, format="csr")]
+        columns, weights = query_vector.indices, query_vector.data
+        scores = np.concatenate([block[:, columns] @ weights for block in [self.matrix] + self.pending])
+        candidates = np.flatnonzero(self.alive & (scores > 0))
+        if link_ids is not None:
+            allowed = set(link_ids)
+            candidates = candidates[[self.ids[row] in allowed for row in candidates.tolist()]]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.ids[row], float(scores[row])) for row in candidates.tolist()]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getstate__(self):
+        self._merge()
+        return {"vectorizer": self.vectorizer, "ids": self.ids, "rows": self.rows, "alive": self.alive,
+                "matrix": self.matrix, "fitted": self.fitted}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.vectorizer = state["vectorizer"]
+        self.ids = state["ids"]
+        self.rows = state["rows"]
+        self.alive = state["alive"]
+        self.matrix = state["matrix"]
+        self.fitted = state["fitted"]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# Exact tag lookups for a library: each tag maps to a bitmap of the rows carrying it (a Python int,
+# bit i = row i), so multi-tag filters are a few big-integer ANDs/ORs and counts are popcounts
+
+def normalize_tag(tag):
+    """Key a tag is matched by: surrounding spaces dropped, case ignored"""
+    return str(tag).strip().casefold()
+
+def split_tags(value):
+    """Individual tags of a comma-separated tags cell"""
+    if not isinstance(value, str):
+        return []
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+def _to_bitmap(rows, size):
+    mask = np.zeros(size, dtype=bool)
+    mask[rows] = True
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+class TagIndex:
+    """Tag dictionary and per-tag row bitmaps of one version of a library"""
+
+    def __init__(self, tags):
+        self.size = len(tags)
+        self.names = {}  # normalized tag -> spelling shown (the first one seen)
+        rows = {}  # normalized tag -> row numbers
+        for row, value in enumerate(tags.tolist() if isinstance(tags, pd.Series) else tags):
+            for tag in split_tags(value):
+                key = normalize_tag(tag)
+                if key not in rows:
+                    rows[key] = []
+                    self.names[key] = tag
+                if not rows[key] or rows[key][-1] != row:
+                    rows[key].append(row)
+        self.bitmaps = {key: _to_bitmap(key_rows, self.size) for key, key_rows in rows.items()}
+        self.counts = {key: len(key_rows) for key, key_rows in rows.items()}
+
+    def options(self, extra=()):
+        """Sorted tag names of the library plus extra ones, each tag listed once whatever its case"""
+        names = dict(self.names)
+        for tag in extra:
+            if str(tag).strip():
+                names.setdefault(normalize_tag(tag), str(tag).strip())
+        return sorted(names.values(), key=str.casefold)
+
+    def bitmap(self, tags, match_all=False):
+        """Rows with all (match_all) or any of the tags"""
+        bitmaps = [self.bitmaps.get(normalize_tag(tag), 0) for tag in tags]
+        if not bitmaps:
+            return (1 << self.size) - 1
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap if match_all else result | bitmap
+        return result
+
+    def mask(self, tags, match_all=False):
+        """Boolean row mask of bitmap(tags, match_all), for filtering the library DataFrame"""
+        data = self.bitmap(tags, match_all).to_bytes((self.size + 7) // 8, "little")
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=self.size, bitorder="little").astype(bool)
+
+    def count(self, tags, match_all=False):
+        """Number of rows with all (match_all) or any of the tags"""
+        return self.bitmap(tags, match_all).bit_count()
+
+    def tag_counts(self):
+        """Links per tag, most used first"""
+        counts = pd.Series({self.names[key]: count for key, count in self.counts.items()}, dtype=int)
+        return counts.sort_values(ascending=False, kind="stable")
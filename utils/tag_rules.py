@@ -0,0 +1,162 @@
+import json
+import logging
+import threading
+from collections import deque, namedtuple
+from urllib.parse import urlsplit
+from utils.config import get_setting
+
+# Built-in rules, in priority order. Keywords match words in the title/description
+# (at a word start, so "shop" matches "shopping" but not "workshop"); domains match
+# the URL host or any parent domain of it. URL paths are never keyword-matched.
+DEFAULT_TAG_RULES = {
+    "News": {
+        "keywords": ["news", "article", "cnn", "bbc", "nytimes", "guardian"],
+        "domains": ["cnn.com", "bbc.com", "bbc.co.uk", "nytimes.com", "theguardian.com", "reuters.com", "apnews.com"]
+    },
+    "Shopping": {
+        "keywords": ["shop", "store", "buy", "amazon", "ebay", "walmart"],
+        "domains": ["amazon.com", "ebay.com", "walmart.com", "etsy.com", "aliexpress.com"]
+    },
+    "Research": {
+        "keywords": ["research", "study", "paper", "arxiv", "scholar", "academic"],
+        "domains": ["arxiv.org", "scholar.google.com", "researchgate.net", "semanticscholar.org", "nature.com"]
+    },
+    "Entertainment": {
+        "keywords": ["movie", "music", "youtube", "netflix", "spotify"],
+        "domains": ["youtube.com", "youtu.be", "netflix.com", "spotify.com", "imdb.com"]
+    },
+    "Cloud": {
+        "keywords": ["cloud", "aws", "azure", "google cloud"],
+        "domains": ["aws.amazon.com", "azure.microsoft.com", "cloud.google.com"]
+    },
+    "Education": {
+        "keywords": ["education", "course", "coursera", "edx", "khan"],
+        "domains": ["coursera.org", "edx.org", "khanacademy.org", "udemy.com"]
+    },
+}
+
+TagRuleMatch = namedtuple("TagRuleMatch", ["tag", "kind", "pattern"])
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every keyword occurrence in one pass over the text"""
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, payload)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword, payload in keywords:
+            node = 0
+            for char in keyword:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((len(keyword), keyword, payload))
+        # Breadth-first pass to set failure links and merge outputs
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, child in self.goto[node].items():
+                pending.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, text):
+        """Yield (start, keyword, payload) for every occurrence in text"""
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, keyword, payload in self.output[node]:
+                yield end - length + 1, keyword, payload
+
+class TagRuleEngine:
+    """Keyword automaton plus host lookup table, compiled once from a rules dict"""
+
+    def __init__(self, rules):
+        self.tags = list(rules)
+        keywords = []
+        self.domains = {}
+        for priority, (tag, rule) in enumerate(rules.items()):
+            for keyword in rule.get("keywords", []):
+                if keyword.strip():
+                    keywords.append((keyword.strip().lower(), priority))
+            for domain in rule.get("domains", []):
+                self.domains.setdefault(domain.strip().lower().lstrip("."), priority)
+        self.automaton = KeywordAutomaton(keywords)
+
+    def match_domain(self, url):
+        """Match the URL host, then each parent domain (edition.cnn.com -> cnn.com)"""
+        try:
+            host = (urlsplit(url).hostname or "").lower()
+        except ValueError:
+            return None
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            domain = ".".join(labels[i:])
+            if domain in self.domains:
+                return TagRuleMatch(self.tags[self.domains[domain]], "domain", domain)
+        return None
+
+    def match_keywords(self, text):
+        """Return the highest-priority keyword found at a word start in text"""
+        best = None
+        for start, keyword, priority in self.automaton.iter_matches(text):
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if best is None or priority < best[0]:
+                best = (priority, keyword)
+                if priority == 0:
+                    break
+        return TagRuleMatch(self.tags[best[0]], "keyword", best[1]) if best else None
+
+    def match(self, text, url):
+        """Return the TagRuleMatch explaining the tag for (text, url), or None"""
+        return self.match_domain(url or "") or self.match_keywords((text or "").lower())
+
+    def tag(self, text, url):
+        """Return the rule tag for (text, url), or Other when no rule matches"""
+        matched = self.match(text, url)
+        return matched.tag if matched else "Other"
+
+def load_rules(path=None):
+    """Default rules merged with a user JSON rule file ({"Tag": {"keywords": [...], "domains": [...]}})"""
+    path = path or get_setting("TAG_RULES_FILE")
+    if not path:
+        return DEFAULT_TAG_RULES
+    try:
+        with open(path, "r") as f:
+            user_rules = json.load(f)
+    except Exception as e:
+        logging.error(f"Failed to load tag rules from {path}: {str(e)}")
+        return DEFAULT_TAG_RULES
+    # User rules come first so they win over the defaults
+    rules = {}
+    for tag, rule in list(user_rules.items()) + list(DEFAULT_TAG_RULES.items()):
+        merged = rules.setdefault(tag, {"keywords": [], "domains": []})
+        merged["keywords"] += list(rule.get("keywords", []))
+        merged["domains"] += list(rule.get("domains", []))
+    logging.debug(f"Loaded {len(user_rules)} user tag rules from {path}")
+    return rules
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_rule_engine():
+    """Return the process-wide rule engine, compiling it on first use"""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = TagRuleEngine(load_rules())
+        return _ENGINE
+
+def match_tag_rule(text, url):
+    """Explain which rule (if any) tags (text, url)"""
+    return get_rule_engine().match(text, url)
@@ -1,8 +1,19 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from utils.data_manager import save_data
-from utils.link_operations import save_link, delete_selected_links, fetch_metadata, process_bookmark_file
+from utils.data_manager import make_add_ops, get_cache_stats, get_data_version, drive_available
+from utils.save_queue import queue_changes, get_save_status
+from utils.import_jobs import start_import_job, list_import_jobs, cancel_import_job, resume_import_job, dismiss_import_job
+from utils.metadata_cache import get_metadata_cache_stats
+from utils.link_operations import save_link, delete_selected_links, rededupe_links, fetch_metadata, process_bookmark_file, predict_tag
+from utils.online_tagger import learn_tags
+from utils.tag_rules import match_tag_rule
+from utils.exporters import EXPORT_FORMATS, export_bytes
+from utils.url_index import get_url_index, build_url_index, near_duplicate_matches, ranked_links
+from utils.search_index import RANKED_RESULTS
+from utils.content_archive import ARCHIVE_PAGE_TEXT, search_page_text, get_archive_stats
+from utils.tag_index import TagIndex
 import logging
 from io import BytesIO
 import openpyxl
@@ -138,6 +149,35 @@ def apply_css(is_mobile=False):
     """
     st.markdown(css, unsafe_allow_html=True)
 
+def set_user_df(df):
+    """Store the Public user's links, bumping the session's data version for memoized exports"""
+    st.session_state["user_df"] = df
+    st.session_state["user_df_version"] = st.session_state.get("user_df_version", 0) + 1
+
+def get_library_index(df, excel_file, mode):
+    """Lookup indexes behind Browse search and near-duplicate columns; Public sessions memoize theirs per data version"""
+    if mode in ["admin", "guest"] and excel_file:
+        return get_url_index(df, excel_file, st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", ""))
+    version = st.session_state.get("user_df_version", 0)
+    cached = st.session_state.get("library_index")
+    if not cached or cached[0] != version:
+        cached = (version, build_url_index(df))
+        st.session_state["library_index"] = cached
+    return cached[1]
+
+def get_tag_index(df, excel_file, mode):
+    """Tag dictionary and per-tag row bitmaps of the library, built once per data version"""
+    if mode in ["admin", "guest"] and excel_file:
+        folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "")
+        version = (folder_id, excel_file, get_data_version(excel_file, folder_id), len(df))
+    else:
+        version = ("public", st.session_state.get("user_df_version", 0), len(df))
+    cached = st.session_state.get("tag_index")
+    if not cached or cached[0] != version:
+        cached = (version, TagIndex(df["tags"] if "tags" in df.columns else []))
+        st.session_state["tag_index"] = cached
+    return cached[1]
+
 def display_header(mode):
     """Display the app header with mode-specific styling, logout button, and layout toggle"""
     if 'layout_mode' not in st.session_state:
@@ -177,6 +217,21 @@ def display_header(mode):
         # Debug output for layout mode
         # st.write(f"Debug: Current layout mode={st.session_state['layout_mode']}")
 
+def display_save_status(excel_file, mode):
+    """Show whether queued edits for the library are still being saved to Google Drive"""
+    if mode not in ["admin", "guest"] or not excel_file:
+        return
+    folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "")
+    status = get_save_status(excel_file, folder_id)
+    if status["last_error"]:
+        st.warning(f"⚠️ Saving to Google Drive failed ({status['attempts']} attempts), retrying: {status['last_error']}")
+    elif status["progress"] is not None:
+        st.caption(f"⏳ Uploading library to Google Drive: {int(status['progress'] * 100)}%")
+    elif status["pending"] or status["flushing"]:
+        st.caption(f"⏳ Saving {status['pending'] or 'recent'} change(s) to Google Drive...")
+    elif status["last_flushed"]:
+        st.caption(f"☁️ All changes saved to Google Drive at {status['last_flushed'].strftime('%H:%M:%S')}")
+
 def login_form():
     """Display login form for Admin, Guest, or Public access"""
     apply_css()  # Default to desktop
@@ -276,6 +331,45 @@ def login_form():
             time.sleep(0.5)
             st.rerun()
 
+def import_jobs_panel(excel_file, folder_id):
+    """List background import jobs for the library with progress, cancel, resume and dismiss controls"""
+    jobs = list_import_jobs(excel_file, folder_id)
+    if not jobs:
+        return
+    st.markdown("<h4>Import Jobs</h4>", unsafe_allow_html=True)
+    if st.button("🔄 Refresh", key="refresh_import_jobs", help="Update import progress"):
+        st.rerun()
+    status_icons = {
+        "queued": "⏳", "running": "⏳", "completed": "✅",
+        "cancelled": "⏹️", "failed": "❌", "interrupted": "⚠️"
+    }
+    for job in jobs:
+        job_id = job["job_id"]
+        st.markdown(f"{status_icons.get(job['status'], '')} **{job['file_name']}** ({job['status']}, started {job['created_at']})")
+        processed, read = job.get("processed", 0), job.get("read", 0)
+        if job["status"] in ["queued", "running"]:
+            st.progress(min((job["read_fraction"] or 0.0) * processed / max(read, 1), 1.0),
+                        text=f"{processed} of {read} links processed")
+        st.caption(f"{job['imported']} links added, {job['links_read']} read from the file")
+        if job["error"]:
+            st.error(f"❌ {job['error']}")
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if job["status"] in ["queued", "running"]:
+                if st.button("⏹️ Cancel", key=f"cancel_{job_id}", help="Stop after the current batch; links added so far are kept"):
+                    cancel_import_job(job_id)
+                    st.rerun()
+            elif job["status"] in ["cancelled", "failed", "interrupted"]:
+                if st.button("▶️ Resume", key=f"resume_{job_id}", help="Continue from the last saved batch"):
+                    if not resume_import_job(job_id):
+                        st.error("❌ This import can no longer be resumed")
+                    st.rerun()
+        with col2:
+            if job["status"] not in ["queued", "running"]:
+                if st.button("🗑️ Dismiss", key=f"dismiss_{job_id}", help="Remove this job from the list"):
+                    dismiss_import_job(job_id)
+                    st.rerun()
+
 def add_link_section(df, excel_file, mode):
     """Section for adding new links or uploading bookmark files"""
     apply_css(is_mobile=st.session_state.get('layout_mode', 'desktop') == 'mobile')
@@ -329,6 +423,13 @@ def add_link_section(df, excel_file, mode):
                     st.session_state['auto_title'] = metadata.get("title", "")
                     st.session_state['auto_description'] = metadata.get("description", "")
                     st.session_state['suggested_tags'] = metadata.get("tags", [])
+                    if not st.session_state['suggested_tags'] and (st.session_state['auto_title'] or st.session_state['auto_description']):
+                        folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "") if mode in ["admin", "guest"] else ""
+                        suggested_tag = predict_tag(
+                            f"{st.session_state['auto_title']} {st.session_state['auto_description']}",
+                            url_temp, excel_file if mode in ["admin", "guest"] else None, folder_id
+                        )
+                        st.session_state['suggested_tags'] = [suggested_tag] if suggested_tag else []
                     logging.debug(f"Fetched metadata for {url_temp}: title={st.session_state['auto_title']}, description={st.session_state['auto_description']}, tags={st.session_state['suggested_tags']}")
                     st.session_state['clear_url'] = False
                     st.session_state['metadata_fetched'] = True
@@ -346,7 +447,7 @@ def add_link_section(df, excel_file, mode):
         with st.expander("Debug Tools", expanded=False):
             st.markdown("### Debug Information")
             if st.button("Show Session State Keys", help="Display non-sensitive session state keys"):
-                protected_keys = ['mode', 'username', 'df', 'user_df', 'public_warning_shown', 'layout_mode']
+                protected_keys = ['mode', 'username', 'df', 'user_df', 'user_df_version', 'export_cache', 'public_warning_shown', 'layout_mode']
                 safe_keys = [k for k in st.session_state.keys() if k not in protected_keys]
                 st.write(f"Session state keys: {safe_keys}")
                 logging.debug(f"Displayed session state keys: {safe_keys}")
@@ -355,10 +456,25 @@ def add_link_section(df, excel_file, mode):
                 st.write(f"Suggested tags: {st.session_state.get('suggested_tags', [])}")
                 st.write(f"Auto title: {st.session_state.get('auto_title', '')}")
                 st.write(f"Auto description: {st.session_state.get('auto_description', '')}")
+                rule_match = match_tag_rule(
+                    f"{st.session_state.get('auto_title', '')} {st.session_state.get('auto_description', '')}",
+                    st.session_state.get(url_input_key, '')
+                )
+                st.write(f"Matched tag rule: {f'{rule_match.tag} ({rule_match.kind}: {rule_match.pattern})' if rule_match else 'none'}")
                 logging.debug(f"Tag info: suggested_tags={st.session_state.get('suggested_tags', [])}, title={st.session_state.get('auto_title', '')}")
             
+            if st.button("Show Cache Stats", help="Display Google Drive read cache hit/miss counters"):
+                stats = get_cache_stats()
+                st.write(f"Read cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} cached files")
+                metadata_stats = get_metadata_cache_stats()
+                st.write(f"Metadata cache: {metadata_stats['hits']} hits, {metadata_stats['stale']} stale, {metadata_stats['misses']} misses, {metadata_stats['revalidated']} revalidated")
+                archive_stats = get_archive_stats()
+                st.write(f"Page archive: {archive_stats['pages']} pages, {archive_stats['texts']} distinct texts, "
+                         f"{archive_stats['compressed_bytes'] / 2 ** 20:.1f} MB compressed from {archive_stats['raw_bytes'] / 2 ** 20:.1f} MB")
+                logging.debug(f"Read cache stats: {stats}, metadata cache stats: {metadata_stats}")
+            
             if st.button("Clear Non-Critical Session State", help="Reset non-critical session state for testing"):
-                protected_keys = ['mode', 'username', 'df', 'user_df', 'public_warning_shown', 'layout_mode']
+                protected_keys = ['mode', 'username', 'df', 'user_df', 'user_df_version', 'export_cache', 'public_warning_shown', 'layout_mode']
                 keys_to_delete = [k for k in st.session_state.keys() if k not in protected_keys]
                 for key in keys_to_delete:
                     del st.session_state[key]
@@ -389,14 +505,12 @@ def add_link_section(df, excel_file, mode):
                 key="description_input"
             )
             
-            all_tags = []
-            if 'tags' in working_df.columns:
-                all_tags = sorted({str(tag).strip() for tags in working_df['tags']
-                                 for tag in (tags.split(',') if isinstance(tags, str) else [str(tags)])
-                                 if str(tag).strip()})
             default_tags = ['News', 'Shopping', 'Research', 'Entertainment', 'Cloud', 'Education', 'Other']
-            suggested_tags = st.session_state.get('suggested_tags', [])
-            all_tags = sorted(list(set(all_tags + default_tags + [str(tag).strip() for tag in suggested_tags if str(tag).strip()])))
+            suggested_tags = [str(tag).strip() for tag in st.session_state.get('suggested_tags', []) if str(tag).strip()]
+            all_tags = get_tag_index(working_df, excel_file, mode).options(default_tags + suggested_tags)
+            # Suggestions are preselected, so they must be spelled exactly as an option
+            options_by_key = {tag.casefold(): tag for tag in all_tags}
+            suggested_tags = list(dict.fromkeys(options_by_key[tag.casefold()] for tag in suggested_tags))
             
             logging.debug(f"Rendering multiselect: suggested_tags={suggested_tags}, all_tags={all_tags}")
             
@@ -441,12 +555,13 @@ def add_link_section(df, excel_file, mode):
                 elif not title:
                     st.error("❌ Please enter a title")
                 else:
-                    new_df = save_link(working_df, url, title, description, tags, priority, number, mode)
+                    folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "") if mode in ["admin", "guest"] else ""
+                    new_df = save_link(working_df, url, title, description, tags, priority, number, mode, excel_file if mode in ["admin", "guest"] else None, folder_id)
                     if new_df is not None:
                         if mode in ["admin", "guest"] and excel_file:
-                            folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "")
-                            if save_data(new_df, excel_file, folder_id):
+                            if queue_changes(new_df, excel_file, folder_id, make_add_ops(new_df.tail(1))):
                                 st.session_state['df'] = new_df
+                                learn_tags(excel_file, folder_id, [f"{title} {description}"], [url], [tags])
                                 st.success("✅ Link saved successfully!")
                                 if new_df.iloc[-1]["is_duplicate"]:
                                     st.warning("⚠️ This URL is a duplicate.")
@@ -460,7 +575,7 @@ def add_link_section(df, excel_file, mode):
                             else:
                                 st.error("❌ Failed to save link to Google Drive")
                         else:
-                            st.session_state['user_df'] = new_df
+                            set_user_df(new_df)
                             st.success("✅ Link saved successfully! Download your links as they are temporary.")
                             if new_df.iloc[-1]["is_duplicate"]:
                                 st.warning("⚠️ This URL is a duplicate.")
@@ -479,7 +594,7 @@ def add_link_section(df, excel_file, mode):
         with st.form(key="upload_bookmarks_form", clear_on_submit=True):
             uploaded_file = st.file_uploader(
                 "Upload Bookmarks (Excel, CSV, HTML)",
-                type=["xlsx", "csv", "html"],
+                type=["xlsx", "csv", "html", "htm"],
                 key="bookmark_uploader"
             )
             duplicate_action = st.selectbox(
@@ -492,13 +607,24 @@ def add_link_section(df, excel_file, mode):
             submitted = st.form_submit_button("Import Bookmarks", help="Import bookmarks from file")
             
             if submitted:
-                if uploaded_file:
+                if uploaded_file and mode in ["admin", "guest"] and excel_file and drive_available() and st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", ""):
+                    # Drive-backed libraries import in a background job that survives reruns
+                    try:
+                        start_import_job(uploaded_file, excel_file, st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", ""), duplicate_action)
+                        st.success(f"✅ Import of {uploaded_file.name} started. Links are added in batches as they are processed.")
+                    except Exception as e:
+                        st.error(f"❌ Failed to start import: {str(e)}")
+                        logging.error(f"Import job start failed: {str(e)}")
+                elif uploaded_file:
                     try:
                         progress_bar = st.progress(0)
-                        new_df = process_bookmark_file(working_df, uploaded_file, mode, duplicate_action, progress_bar)
+                        folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "") if mode in ["admin", "guest"] else ""
+                        new_df = process_bookmark_file(
+                            working_df, uploaded_file, mode, duplicate_action, progress_bar,
+                            excel_file if mode in ["admin", "guest"] else None, folder_id
+                        )
                         if mode in ["admin", "guest"] and excel_file:
-                            folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "")
-                            if save_data(new_df, excel_file, folder_id):
+                            if queue_changes(new_df, excel_file, folder_id, make_add_ops(new_df.iloc[len(working_df):])):
                                 st.session_state['df'] = new_df
                                 st.success(f"✅ Bookmarks imported! {len(new_df) - len(working_df)} new links added.")
                                 if new_df["is_duplicate"].any():
@@ -509,7 +635,7 @@ def add_link_section(df, excel_file, mode):
                             else:
                                 st.error("❌ Failed to save bookmarks to Google Drive")
                         else:
-                            st.session_state['user_df'] = new_df
+                            set_user_df(new_df)
                             st.success(f"✅ Bookmarks imported! {len(new_df) - len(working_df)} new links added.")
                             if new_df["is_duplicate"].any():
                                 st.warning("⚠️ Some URLs are duplicates.")
@@ -524,9 +650,31 @@ def add_link_section(df, excel_file, mode):
                         progress_bar.empty()
                 else:
                     st.error("❌ Please upload a bookmark file")
+        
+        if mode in ["admin", "guest"] and excel_file:
+            import_jobs_panel(excel_file, st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", ""))
     
     return working_df
 
+# Browse table paging and server-side orders
+BROWSE_PAGE_SIZES = [25, 50, 100, 250]
+PRIORITY_ORDER = {"Important": 0, "High": 1, "Medium": 2, "Low": 3}
+BROWSE_SORTS = ["Priority", "Newest", "Oldest", "Title"]
+
+def browse_order(df, sort_by):
+    """Row positions of df in the chosen order, without reordering df itself"""
+    if df.empty:
+        return np.zeros(0, dtype=np.int64)
+    if sort_by == "Newest":
+        return np.argsort(df["created_at"].astype(str).to_numpy(), kind="stable")[::-1]
+    if sort_by == "Oldest":
+        return np.argsort(df["created_at"].astype(str).to_numpy(), kind="stable")
+    if sort_by == "Title":
+        return np.argsort(df["title"].fillna("").astype(str).str.casefold().to_numpy(), kind="stable")
+    priority = df["priority"].map(PRIORITY_ORDER).to_numpy(dtype=float)
+    number = pd.to_numeric(df["number"], errors="coerce").to_numpy(dtype=float)
+    return np.lexsort((number, priority))
+
 def browse_section(df, excel_file, mode):
     """Section to browse, search, and delete links"""
     apply_css(is_mobile=st.session_state.get('layout_mode', 'desktop') == 'mobile')
@@ -554,16 +702,22 @@ def browse_section(df, excel_file, mode):
     df["tags"] = df["tags"].apply(lambda x: str(x) if pd.notnull(x) else "")
     df["is_duplicate"] = df["is_duplicate"].astype(bool)
     
-    # Debug DataFrame shape
-    st.write(f"Debug: DataFrame shape before filtering: {df.shape}")
+    logging.debug(f"Browsing {len(df)} links")
     
     # Search and filter inputs in a single row
     col1, col2, col3 = st.columns([2, 2, 1])
     with col1:
-        search_query = st.text_input("Search Links", placeholder="Enter keywords or tags...", key="search_query")
+        search_query = st.text_input("Search Links", placeholder="Enter keywords or tags...", key="search_query",
+                                     help="Links containing every word match. Use OR for alternatives and * for word beginnings, e.g. python OR rust*")
+        rank_results = st.checkbox("Rank by relevance", key="rank_results",
+                                   help=f"Order matches by how well their title, description and tags fit the search, best {RANKED_RESULTS} first")
+        page_text = ARCHIVE_PAGE_TEXT and st.checkbox("Search page text", key="search_page_text",
+                                                      help="Also match the archived text of each page, best matches first")
     with col2:
-        tag_options = sorted(set(','.join(df["tags"].dropna()).split(','))) if not df.empty and "tags" in df.columns else []
-        tag_filter = st.multiselect("Filter by Tags", options=tag_options, key="tag_filter")
+        tag_index = get_tag_index(df, excel_file, mode)
+        tag_filter = st.multiselect("Filter by Tags", options=tag_index.options(), key="tag_filter")
+        match_all_tags = st.checkbox("Match all selected tags", key="match_all_tags",
+                                     help="Show only links carrying every selected tag instead of any of them")
     with col3:
         priority_filter = st.selectbox("Filter by Priority", ["All", "Low", "Medium", "High", "Important"], key="priority_filter")
     
@@ -582,29 +736,77 @@ def browse_section(df, excel_file, mode):
             st.warning("⚠️ Please enter a search query or select tags.")
     
     # Filter DataFrame
-    filtered_df = df.copy()
+    library_index = get_library_index(df, excel_file, mode)
+    keep = np.ones(len(df), dtype=bool)
     if search_query:
-        filtered_df = filtered_df[
-            filtered_df["title"].str.contains(search_query, case=False, na=False) |
-            filtered_df["description"].str.contains(search_query, case=False, na=False) |
-            filtered_df["url"].str.contains(search_query, case=False, na=False) |
-            filtered_df["tags"].str.contains(search_query, case=False, na=False)
-        ]
+        with library_index.lock:
+            matches = library_index.search.search(search_query)
+        page_ranks = {}
+        if page_text:
+            # Full-text hits come from the on-disk archive, best BM25 score first
+            url_ranks = {key: i for i, key in enumerate(search_page_text(search_query))}
+            page_ranks = {link_id: url_ranks[key] for link_id, key in library_index.links_with_keys(url_ranks).items()}
+        if matches is not None:
+            keep &= (df["link_id"].isin(matches) | df["link_id"].isin(page_ranks)).to_numpy()
     if tag_filter:
-        filtered_df = filtered_df[filtered_df["tags"].str.contains('|'.join(tag_filter), case=False, na=False)]
+        keep &= tag_index.mask(tag_filter, match_all_tags)
     if priority_filter != "All":
-        filtered_df = filtered_df[filtered_df["priority"] == priority_filter]
-    
-    # Sort by priority and number
-    priority_order = {"Important": 0, "High": 1, "Medium": 2, "Low": 3}
-    if not filtered_df.empty:
-        filtered_df["priority_order"] = filtered_df["priority"].map(priority_order)
-        filtered_df = filtered_df.sort_values(by=["priority_order", "number"]).drop(columns=["priority_order"])
-    
-    if not filtered_df.empty:
+        keep &= (df["priority"] == priority_filter).to_numpy()
+    filtered_df = df[keep]
+    
+    # Order the matches server-side; only the page being shown is ever sliced out of the library
+    relevance = bool(search_query) and bool(page_text or rank_results)
+    controls = st.columns([2, 1, 1])
+    with controls[0]:
+        sort_by = st.selectbox("Sort by", list(BROWSE_SORTS), key="browse_sort", disabled=relevance,
+                               help="Relevance modes order results by how well they match the search")
+    with controls[1]:
+        page_size = st.selectbox("Rows per page", BROWSE_PAGE_SIZES, index=BROWSE_PAGE_SIZES.index(50), key="browse_page_size")
+    order = browse_order(filtered_df, sort_by)
+    matched = len(order)
+    
+    # Page text mode: best BM25 matches first; other matches keep their priority order after them
+    if page_text and search_query and matched:
+        rank = filtered_df["link_id"].map(page_ranks).fillna(len(page_ranks)).to_numpy()
+        order = order[np.argsort(rank[order], kind="stable")]
+    # Ranked mode: best TF-IDF matches first; matches without a score keep their priority order after them
+    elif rank_results and search_query and matched:
+        try:
+            ranked = ranked_links(library_index, df, search_query, RANKED_RESULTS, filtered_df["link_id"])
+            position = {link_id: i for i, (link_id, _) in enumerate(ranked)}
+            rank = filtered_df["link_id"].map(position).fillna(len(ranked)).to_numpy()
+            order = order[np.argsort(rank[order], kind="stable")][:RANKED_RESULTS]
+            if matched > RANKED_RESULTS:
+                st.caption(f"Showing the {RANKED_RESULTS} most relevant of {matched} matching links.")
+        except Exception as e:
+            st.error(f"❌ Failed to rank search results: {str(e)}")
+            logging.error(f"Ranked search failed: {str(e)}")
+    
+    # The cursor goes back to the first page whenever the result set or its order changes
+    pages = max(1, -(-len(order) // page_size))
+    signature = (search_query, tuple(tag_filter), match_all_tags, priority_filter, sort_by, page_size, rank_results, page_text)
+    if st.session_state.get("browse_signature") != signature:
+        st.session_state["browse_signature"] = signature
+        st.session_state["browse_page"] = 1
+    st.session_state["browse_page"] = min(max(1, st.session_state.get("browse_page", 1)), pages)
+    with controls[2]:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="browse_page")
+    
+    # Delete selections are kept by link_id, so they survive paging, sorting and filtering
+    selected = st.session_state.setdefault("browse_selected", set())
+    if selected:
+        selected.intersection_update(df.loc[df["link_id"].isin(selected), "link_id"])
+    
+    if len(order):
         st.markdown("<h4>View All Links</h4>", unsafe_allow_html=True)
-        display_df = filtered_df[["url", "title", "description", "tags", "priority", "number", "is_duplicate"]].copy()
-        display_df["delete"] = False
+        first = (page - 1) * page_size
+        page_df = filtered_df.iloc[order[first:first + page_size]]
+        st.caption(f"Showing {first + 1}–{first + len(page_df)} of {len(order)} links")
+        display_df = page_df[["url", "title", "description", "tags", "priority", "number", "is_duplicate"]].reset_index(drop=True)
+        similarity, duplicate_of = near_duplicate_matches(page_df["link_id"], library_index, df)
+        display_df["similarity"] = similarity
+        display_df["duplicate_of"] = duplicate_of
+        display_df["delete"] = page_df["link_id"].isin(selected).to_numpy()
         
         # Adjust column widths based on layout mode
         is_mobile = st.session_state.get('layout_mode', 'desktop') == 'mobile'
@@ -616,110 +818,137 @@ def browse_section(df, excel_file, mode):
             "tags": st.column_config.TextColumn("Tags", width=80 if is_mobile else 150),
             "priority": st.column_config.TextColumn("Priority", width=60 if is_mobile else 100),
             "number": st.column_config.NumberColumn("Number", width=50 if is_mobile else 80),
-            "is_duplicate": st.column_config.CheckboxColumn("Is Duplicate", width=80 if is_mobile else 100)
+            "is_duplicate": st.column_config.CheckboxColumn("Is Duplicate", width=80 if is_mobile else 100),
+            "similarity": st.column_config.NumberColumn("Similarity", format="%.2f", width=60 if is_mobile else 90,
+                                                        help="How alike this link's title and description are to its closest other link"),
+            "duplicate_of": st.column_config.LinkColumn("Possible Duplicate Of", width=100 if is_mobile else 200)
         }
         
         try:
+            # Keyed by the page's rows and checkboxes: edits made to one page are never replayed onto other rows
+            editor_key = f"browse_editor_{hash((tuple(page_df['link_id']), tuple(display_df['delete'])))}"
             edited_df = st.data_editor(
                 display_df,
                 column_config=column_config,
                 hide_index=True,
                 use_container_width=True,
-                disabled=["url", "title", "description", "tags", "priority", "number", "is_duplicate"]
+                disabled=["url", "title", "description", "tags", "priority", "number", "is_duplicate", "similarity", "duplicate_of"],
+                key=editor_key
             )
-            logging.debug(f"Data editor rendered, delete column exists: {'delete' in edited_df.columns}")
+            logging.debug(f"Data editor rendered page {page}/{pages}: {len(display_df)} of {len(order)} rows")
         except Exception as e:
             st.error(f"❌ Failed to display data table: {str(e)}")
             logging.error(f"Data editor failed: {str(e)}")
             return
         
+        for link_id, checked in zip(page_df["link_id"], edited_df["delete"]):
+            if checked:
+                selected.add(link_id)
+            else:
+                selected.discard(link_id)
+        
         # Debug button to show link_ids
-        if st.button("Show Link IDs (Debug)", help="Display link_ids for selected rows"):
-            selected_indices = edited_df[edited_df["delete"] == True].index
-            if not selected_indices.empty:
-                selected_link_ids = filtered_df.iloc[selected_indices]["link_id"].tolist()
-                st.write(f"Selected link_ids: {selected_link_ids}")
+        if st.button("Show Link IDs (Debug)", help="Display link_ids of the links selected for deletion"):
+            if selected:
+                st.write(f"Selected link_ids: {sorted(selected)}")
             else:
                 st.write("No rows selected")
         
-        # Show delete button only if at least one checkbox is checked
-        if "delete" in edited_df.columns and edited_df["delete"].any():
-            logging.debug(f"Delete button visible: {edited_df['delete'].sum()} rows selected")
-            if st.button("🗑️ Delete Selected Links", help="Delete selected links"):
+        # Show delete button only if at least one checkbox is checked, on this page or another
+        if selected:
+            logging.debug(f"Delete button visible: {len(selected)} rows selected")
+            delete_column, clear_column = st.columns([2, 1])
+            with clear_column:
+                if st.button("Clear Selection", help="Uncheck every link selected for deletion"):
+                    selected.clear()
+                    st.rerun()
+            with delete_column:
+                delete_clicked = st.button(f"🗑️ Delete {len(selected)} Selected Links", help="Delete the selected links on every page")
+            if delete_clicked:
                 try:
-                    selected_indices = edited_df[edited_df["delete"] == True].index
-                    if not selected_indices.empty:
-                        selected_link_ids = filtered_df.iloc[selected_indices]["link_id"].tolist()
-                        logging.debug(f"Selected link_ids: {selected_link_ids}")
-                        folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "") if mode in ["admin", "guest"] else ""
-                        updated_df = delete_selected_links(df, selected_link_ids, excel_file, mode, folder_id)
-                        logging.debug(f"Post-deletion DataFrame shape: {updated_df.shape}")
-                        if mode == "public":
-                            st.session_state["user_df"] = updated_df
-                        else:
-                            st.session_state["df"] = updated_df
-                        st.success("✅ Selected links deleted successfully!")
-                        st.snow()
-                        time.sleep(2)
-                        st.rerun()
+                    selected_link_ids = list(selected)
+                    logging.debug(f"Selected link_ids: {selected_link_ids}")
+                    folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "") if mode in ["admin", "guest"] else ""
+                    updated_df = delete_selected_links(df, selected_link_ids, excel_file, mode, folder_id)
+                    logging.debug(f"Post-deletion DataFrame shape: {updated_df.shape}")
+                    if mode == "public":
+                        set_user_df(updated_df)
                     else:
-                        st.error("❌ Please select at least one link to delete.")
+                        st.session_state["df"] = updated_df
+                    selected.clear()
+                    st.success("✅ Selected links deleted successfully!")
+                    st.snow()
+                    time.sleep(2)
+                    st.rerun()
                 except Exception as e:
                     st.error(f"❌ Failed to delete links: {str(e)}")
                     logging.error(f"Delete links failed: {str(e)}")
         else:
             logging.debug("Delete button hidden: no rows selected for deletion")
+        
+        if st.button("🧹 Re-check Duplicates", help="Recompute Is Duplicate for all links, ignoring http/https, www., trailing slashes and utm_ parameters"):
+            folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "") if mode in ["admin", "guest"] else ""
+            updated_df, changed = rededupe_links(df, excel_file, mode, folder_id)
+            if changed:
+                if mode == "public":
+                    set_user_df(updated_df)
+                else:
+                    st.session_state["df"] = updated_df
+                st.success(f"✅ Updated the duplicate flag of {changed} links.")
+                time.sleep(1)
+                st.rerun()
+            else:
+                st.info("No duplicate flags needed changing.")
     
-    if filtered_df.empty:
+    if not len(order):
         st.info("No links match the search criteria.")
 
+EXPORT_COLUMNS = [
+    "link_id", "url", "title", "description", "tags", "priority",
+    "number", "created_at", "updated_at", "is_duplicate"
+]
+
 def download_section(df, excel_file, mode):
-    """Section to download links as Excel with hyperlinked URLs"""
+    """Section to download links as Excel (hyperlinked URLs), CSV, JSON Lines or Parquet"""
     apply_css(is_mobile=st.session_state.get('layout_mode', 'desktop') == 'mobile')
     st.markdown("<h3>Export Data</h3>", unsafe_allow_html=True)
     
     if mode == "public":
         df_to_export = st.session_state.get("user_df", pd.DataFrame())
+        version = ("public", st.session_state.get("user_df_version", 0))
     else:
         df_to_export = df
+        folder_id = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID", "")
+        version = (folder_id, excel_file, get_data_version(excel_file, folder_id))
     
     if not df_to_export.empty:
-        output = pd.DataFrame()
-        output["sequence_number"] = range(1, len(df_to_export) + 1)
-        output["link_id"] = df_to_export["link_id"]
-        output["url"] = df_to_export["url"]
-        output["title"] = df_to_export["title"]
-        output["description"] = df_to_export["description"]
-        output["tags"] = df_to_export["tags"]
-        output["priority"] = df_to_export["priority"]
-        output["number"] = df_to_export["number"]
-        output["created_at"] = df_to_export["created_at"]
-        output["updated_at"] = df_to_export["updated_at"]
-        output["is_duplicate"] = df_to_export["is_duplicate"]
+        fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+        extension, mimetype, _ = EXPORT_FORMATS[fmt]
         
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-            output.to_excel(writer, index=False, sheet_name="Links")
-            workbook = writer.book
-            worksheet = writer.sheets["Links"]
-            
-            for idx, url in enumerate(output["url"], start=2):
-                worksheet[f"C{idx}"].hyperlink = url
-                worksheet[f"C{idx}"].style = "Hyperlink"
-            
-        buffer.seek(0)
+        # Build the file only when asked, and reuse it until the library changes
+        cache_key = version + (fmt,)
+        cached = st.session_state.get("export_cache")
+        if not cached or cached[0] != cache_key:
+            if st.button(f"Prepare {fmt} Export", help="Build the export file for download"):
+                with st.spinner(f"Preparing {fmt} export..."):
+                    output = df_to_export.reindex(columns=EXPORT_COLUMNS)
+                    output.insert(0, "sequence_number", range(1, len(output) + 1))
+                    st.session_state["export_cache"] = (cache_key, export_bytes(output, fmt))
+                logging.debug(f"Built {fmt} export for {version}: {len(st.session_state['export_cache'][1])} bytes")
+                cached = st.session_state["export_cache"]
         
-        st.download_button(
-            label="Download Links as Excel",
-            data=buffer.getvalue(),
-            file_name="links.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            help="Download links as an Excel file with clickable URLs"
-        )
+        if cached and cached[0] == cache_key:
+            st.download_button(
+                label=f"Download Links as {fmt}",
+                data=cached[1],
+                file_name=f"links.{extension}",
+                mime=mimetype,
+                help="Download links as an Excel file with clickable URLs" if fmt == "Excel" else f"Download links as {fmt}"
+            )
     else:
         st.info("No links available to export.")
 
-def analytics_section(df):
+def analytics_section(df, excel_file=None, mode="admin"):
     """Admin-only analytics tab"""
     apply_css(is_mobile=st.session_state.get('layout_mode', 'desktop') == 'mobile')
     st.markdown("<h3>Analytics</h3>", unsafe_allow_html=True)
@@ -733,7 +962,7 @@ def analytics_section(df):
     st.bar_chart(url_counts)
     
     st.markdown("### Most Common Tags")
-    tag_counts = df["tags"].str.split(',', expand=True).stack().value_counts()
+    tag_counts = get_tag_index(df, excel_file, mode).tag_counts()
     st.bar_chart(tag_counts)
     
     st.markdown("### User Activity Trends")
@@ -0,0 +1,260 @@
+import atexit
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+from utils.config import get_cache_dir
+from utils.near_duplicates import NearDuplicateIndex
+from utils.search_index import TokenIndex, TfidfIndex, search_texts, ranking_texts
+from utils.url_utils import canonical_url
+
+# Columns the row hash covers: the URL for duplicate checks, the text and edit time for the search indexes
+HASHED_COLUMNS = ["link_id", "url", "title", "description", "tags", "updated_at"]
+
+def _row_hashes(rows):
+    """Stable 64-bit hash of each row's HASHED_COLUMNS (missing ones count as empty), the same in every process"""
+    result = np.zeros(len(rows), dtype=np.uint64)
+    for column in HASHED_COLUMNS:
+        values = rows[column].to_numpy(dtype=object) if column in rows.columns else np.full(len(rows), "", dtype=object)
+        values = np.where(pd.isna(values), "", values)
+        try:
+            # Hashed as they are when every value is a string, the common case
+            hashed = pd.util.hash_array(values, categorize=False)
+        except TypeError:
+            hashed = pd.util.hash_array(values.astype(str).astype(object), categorize=False)
+        result = result * np.uint64(1000003) ^ hashed
+    return result
+
+def link_texts(titles, descriptions):
+    """Text that near-duplicate fingerprints are computed from"""
+    return [f"{title if isinstance(title, str) else ''} {description if isinstance(description, str) else ''}"
+            for title, description in zip(titles, descriptions)]
+
+def library_fingerprint(df):
+    """Order-independent hash of a library's rows (their HASHED_COLUMNS)"""
+    if df is None or df.empty:
+        return 0
+    return int(_row_hashes(df).sum())
+
+class UrlIndex:
+    """A library's lookup indexes, kept in step with it as links are added and deleted: canonical URLs,
+    near-duplicate fingerprints, search tokens and TF-IDF rows for ranked search"""
+
+    def __init__(self):
+        self.keys = {}  # canonical URL -> number of links with it
+        self.links = {}  # link_id -> (row hash, canonical URL)
+        self.fingerprint = 0
+        self.version = None  # library data version the index is known to match
+        self.near = NearDuplicateIndex()
+        self.search = TokenIndex()
+        self.ranked = TfidfIndex()
+        self.lock = threading.Lock()
+
+    def contains(self, url):
+        """True if a link with the same canonical URL is already in the library"""
+        return canonical_url(url) in self.keys
+
+    def contains_key(self, key):
+        """Like contains, for a URL already passed through canonical_url"""
+        return key in self.keys
+
+    def links_with_keys(self, keys):
+        """{link_id: canonical URL} of the indexed links whose canonical URL is one of keys"""
+        keys = set(keys)
+        with self.lock:
+            return {link_id: key for link_id, (_, key) in self.links.items() if key in keys}
+
+    def add(self, rows, keys=None, text=True):
+        """Index new library rows; keys are their canonical URLs if the caller already has them,
+        text=False indexes URLs only (for one-off duplicate checks)"""
+        link_ids, urls = rows["link_id"].tolist(), rows["url"].tolist()
+        keys = list(keys) if keys is not None else [canonical_url(url) for url in urls]
+        hashes = _row_hashes(rows).tolist()
+        with self.lock:
+            fingerprint = self.fingerprint
+            for link_id, key, row_hash in zip(link_ids, keys, hashes):
+                if link_id in self.links:
+                    continue
+                self.links[link_id] = (row_hash, key)
+                self.keys[key] = self.keys.get(key, 0) + 1
+                fingerprint += row_hash
+            self.fingerprint = fingerprint % 2 ** 64
+            if text:
+                self.near.add(link_ids, link_texts(rows["title"], rows["description"]))
+                self.search.add(link_ids, search_texts(rows))
+                self.ranked.add(link_ids, ranking_texts(rows))
+
+    def remove(self, link_ids):
+        """Drop deleted links from the index"""
+        with self.lock:
+            for link_id in link_ids:
+                entry = self.links.pop(link_id, None)
+                if entry is None:
+                    continue
+                row_hash, key = entry
+                self.keys[key] -= 1
+                if not self.keys[key]:
+                    del self.keys[key]
+                self.fingerprint = (self.fingerprint - row_hash) % 2 ** 64
+            self.near.remove(link_ids)
+            self.search.remove(link_ids)
+            self.ranked.remove(link_ids)
+
+    def __len__(self):
+        return len(self.links)
+
+    def __getstate__(self):
+        # Flat lists pickle several times faster than a dict of tuples
+        link_ids = list(self.links)
+        entries = list(self.links.values())
+        return {
+            "link_ids": link_ids,
+            "hashes": np.array([entry[0] for entry in entries], dtype=np.uint64),
+            "keys": [entry[1] for entry in entries],
+            "fingerprint": self.fingerprint,
+            "near": self.near,
+            "search": self.search,
+            "ranked": self.ranked
+        }
+
+    def __setstate__(self, state):
+        self.links = dict(zip(state["link_ids"], zip(state["hashes"].tolist(), state["keys"])))
+        self.keys = {}
+        for key in state["keys"]:
+            self.keys[key] = self.keys.get(key, 0) + 1
+        self.fingerprint = state["fingerprint"]
+        self.near = state["near"]
+        self.search = state["search"]
+        self.ranked = state["ranked"] if "ranked" in state else TfidfIndex()
+        self.version = None
+        self.lock = threading.Lock()
+
+# One index per library, kept in memory and in CACHE_DIR/url_index so restarts skip the rebuild.
+# Queued ops keep it in step with the library; anything else (a reload from Drive, an import
+# batch) changes the data version, and the next lookup re-checks the index's fingerprint
+_INDEXES = {}  # (folder_id, excel_file) -> UrlIndex
+_DIRTY = set()
+_INDEXES_LOCK = threading.Lock()
+
+def _index_path(excel_file, folder_id):
+    name = hashlib.sha256(f"{folder_id}/{excel_file}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_cache_dir("url_index"), f"{name}.pickle")
+
+def _load_index(excel_file, folder_id):
+    path = _index_path(excel_file, folder_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logging.error(f"Failed to load URL index for {excel_file}: {str(e)}")
+        return None
+
+def _persist_index(excel_file, folder_id, index):
+    path = _index_path(excel_file, folder_id)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with index.lock, open(temp_path, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except Exception as e:
+        logging.error(f"Failed to save URL index for {excel_file}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def build_url_index(df, text=True):
+    """Index every link of a library DataFrame; text=False skips the near-duplicate and search indexes"""
+    index = UrlIndex()
+    if df is not None and not df.empty:
+        index.add(df, text=text)
+    return index
+
+def get_url_index(df, excel_file=None, folder_id=None):
+    """Return the library's URL index; O(1) while it is in step with the library, rebuilt only if it no longer matches df"""
+    if not excel_file:
+        # Session-only libraries have nothing to share the index with; URL checks need no fingerprints
+        return build_url_index(df, text=False)
+    from utils.data_manager import get_data_version
+    key = (folder_id, excel_file)
+    version = get_data_version(excel_file, folder_id)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is not None and index.version == version:
+            return index
+        if index is None:
+            index = _load_index(excel_file, folder_id)
+        if index is None or index.fingerprint != library_fingerprint(df) or len(index) != (0 if df is None else len(df)):
+            logging.debug(f"Rebuilding URL index for {excel_file}")
+            index = build_url_index(df)
+            _persist_index(excel_file, folder_id, index)
+            _DIRTY.discard(key)
+        index.version = version
+        _INDEXES[key] = index
+    return index
+
+def follow_ops(excel_file, folder_id, ops, version):
+    """Apply queued add/delete ops to the library's index; version is the data version they produced"""
+    with _INDEXES_LOCK:
+        index = _INDEXES.get((folder_id, excel_file))
+        if index is None or index.version != version - 1:
+            return  # not in step; the next lookup validates it instead
+        for op in ops:
+            if op["op"] == "add":
+                index.add(pd.DataFrame([op["row"]]))
+            elif op["op"] == "delete":
+                index.remove(op["link_ids"])
+            elif op["op"] == "update" and {"url", "title", "description", "tags"} & set(op["fields"]):
+                # Edited rows hash differently, so the index is rebuilt rather than patched
+                index.version = None
+                index.fingerprint = None
+                _DIRTY.add((folder_id, excel_file))
+                return
+        index.version = version
+        _DIRTY.add((folder_id, excel_file))
+
+def duplicate_flags(df):
+    """Recompute is_duplicate for a whole library: every link after the first (by created_at) with the same canonical URL"""
+    if df.empty:
+        return np.zeros(0, dtype=bool)
+    keys = df["url"].map(canonical_url)
+    order = np.argsort(df["created_at"].astype(str).to_numpy(), kind="stable")
+    flags = np.zeros(len(df), dtype=bool)
+    flags[order] = keys.iloc[order].duplicated(keep="first").to_numpy()
+    return flags
+
+def near_duplicate_matches(link_ids, index, df):
+    """Similarity to, and URL of, each link's most similar other link in df (0 and '' where there is none)"""
+    urls = dict(zip(df["link_id"], df["url"]))
+    similarity, duplicate_of = [], []
+    for link_id in link_ids:
+        match = index.near.match(link_id)
+        if match and match[0] in urls:
+            similarity.append(round(match[1], 2))
+            duplicate_of.append(urls[match[0]])
+        else:
+            similarity.append(0.0)
+            duplicate_of.append("")
+    return similarity, duplicate_of
+
+def ranked_links(index, df, query, k, link_ids=None):
+    """Up to k (link_id, score) pairs of df best matching the query by TF-IDF, fitting the matrix
+    first if the library has outgrown it"""
+    with index.lock:
+        if index.ranked.needs_fit():
+            logging.debug(f"Fitting TF-IDF matrix over {len(df)} links")
+            index.ranked.fit(df["link_id"], ranking_texts(df))
+        return index.ranked.top(query, k, link_ids)
+
+def persist_url_indexes():
+    """Write indexes changed by queued ops since they were saved; used at shutdown"""
+    with _INDEXES_LOCK:
+        dirty = [(key, _INDEXES[key]) for key in _DIRTY if key in _INDEXES]
+        _DIRTY.clear()
+    for (folder_id, excel_file), index in dirty:
+        _persist_index(excel_file, folder_id, index)
+
+atexit.register(persist_url_indexes)
@@ -0,0 +1,46 @@
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url):
+    """Normalize a URL for use as a cache key: lowercase scheme/host, no default port or fragment"""
+    url = str(url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+def canonical_url(url):
+    """Canonical form for duplicate detection: http and https, host case, www., default ports,
+    trailing slashes, fragments and utm_* parameters make no difference"""
+    url = str(url or "").strip()
+    try:
+        parts = urlsplit(url if "://" in url else f"//{url}")
+    except ValueError:
+        return url.lower()
+    # Split the netloc by hand: the hostname/port properties are several times slower
+    scheme = parts.scheme.lower()
+    userinfo, _, host = parts.netloc.rpartition("@")
+    host, colon, port = host.rpartition(":") if host.rpartition(":")[2].isdigit() else (host, "", "")
+    host = host.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if colon and int(port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{int(port)}"
+    if userinfo:
+        host = f"{userinfo}@{host}"
+    query = "&".join(param for param in parts.query.split("&")
+                     if param and not param.split("=")[0].lower().startswith("utm_"))
+    key = host + parts.path.rstrip("/")
+    if scheme not in DEFAULT_PORTS and scheme:
+        key = f"{scheme}://{key}"
+    return f"{key}?{query}" if query else key
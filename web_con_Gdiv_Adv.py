@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
-from utils.ui_components import display_header, login_form, add_link_section, browse_section, download_section, analytics_section
+from utils.ui_components import display_header, display_save_status, set_user_df, login_form, add_link_section, browse_section, download_section, analytics_section
 from utils.data_manager import load_data
+from utils.link_operations import warm_up_models
+from utils.config import get_setting
 import logging
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -10,6 +13,16 @@ logging.basicConfig(level=logging.DEBUG)
 # Set page config for wide layout
 st.set_page_config(page_title="Web Content Manager", layout="wide")
 
+@st.cache_resource
+def start_model_warmup():
+    """Load NLP models in the background once per process"""
+    thread = threading.Thread(target=warm_up_models, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+if str(get_setting("WARMUP_MODELS", "false")).lower() in ["1", "true", "yes"]:
+    start_model_warmup()
+
 def main():
     # Initialize session state
     if "mode" not in st.session_state:
@@ -37,6 +50,7 @@ def main():
         login_form()
     else:
         display_header(st.session_state["mode"])
+        display_save_status(excel_file, st.session_state["mode"])
         
         # Show public user warning after login (once per session)
         if st.session_state["mode"] == "public" and not st.session_state["public_warning_shown"]:
@@ -61,7 +75,9 @@ def main():
             new_df = add_link_section(st.session_state["df"], excel_file, st.session_state["mode"])
             if new_df is not None:
                 if st.session_state["mode"] == "public":
-                    st.session_state["user_df"] = new_df
+                    # Bump the data version only for a new frame, or every rerun would drop memoized exports and indexes
+                    if new_df is not st.session_state.get("user_df"):
+                        set_user_df(new_df)
                 else:
                     st.session_state["df"] = new_df
         
@@ -73,7 +89,7 @@ def main():
         
         if st.session_state["mode"] == "admin" and "Analytics" in tab_dict:
             with tab_dict["Analytics"]:
-                analytics_section(st.session_state["df"])
+                analytics_section(st.session_state["df"], excel_file, st.session_state["mode"])
         
         with tab_dict["Help"]:
             st.markdown("<h3>User Guide</h3>", unsafe_allow_html=True)